@@ -1,11 +1,14 @@
 import os
 import json
+import hashlib
 import logging
+import threading
 from typing import List, Dict, Optional
 import requests
 from google.auth import default
 from google.auth.transport.requests import Request
 import google.auth
+import article_tags
 
 class VertexAISummaryService:
     """Service for generating AI summaries using Vertex AI Search"""
@@ -15,6 +18,11 @@ class VertexAISummaryService:
         self.search_config_id = os.environ.get('VERTEX_AI_SEARCH_CONFIG_ID')
         self.credentials_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
         
+        # Keep-alive session shared by all API calls, and a reusable transport for token refreshes
+        self.session = requests.Session()
+        self._auth_request = Request()
+        self._token_lock = threading.Lock()
+        
         # Set up authentication
         self._setup_authentication()
         
@@ -44,16 +52,19 @@ class VertexAISummaryService:
             self.credentials = None
     
     def _get_access_token(self) -> Optional[str]:
-        """Get access token for API calls"""
+        """Get access token for API calls, refreshing it only when missing or close to expiry"""
         if not self.credentials:
             return None
             
-        try:
-            self.credentials.refresh(Request())
-            return self.credentials.token
-        except Exception as e:
-            logging.error(f"Failed to get access token: {e}")
-            return None
+        with self._token_lock:
+            try:
+                # `valid` is False once the token is within google-auth's refresh threshold of expiry
+                if not self.credentials.valid:
+                    self.credentials.refresh(self._auth_request)
+                return self.credentials.token
+            except Exception as e:
+                logging.error(f"Failed to get access token: {e}")
+                return None
     
     def generate_summary(self, articles: List[Dict]) -> Optional[str]:
         """Generate a summary of recent articles using Vertex AI or fallback text processing"""
@@ -131,7 +142,7 @@ class VertexAISummaryService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, json=payload, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -175,7 +186,7 @@ class VertexAISummaryService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, json=payload, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -208,82 +219,41 @@ class VertexAISummaryService:
             if not articles:
                 return None
             
-            # Extract specific information from articles
-            key_events = []
-            locations = []
-            organizations = []
-            dates = []
+            # Combine the organizations, events and locations tagged at ingest
+            key_events = set()
+            locations = set()
+            organizations = set()
             
             for article in articles:
-                title = article.get('title', '').lower()
-                summary = article.get('summary', '').lower()
-                content = article.get('content', '').lower()
-                full_text = f"{title} {summary} {content}"
-                
-                # Extract specific events and activities
-                if '정의기억연대' in full_text or '정의연' in full_text:
-                    organizations.append('정의기억연대')
-                if '국가인권위원회' in full_text:
-                    organizations.append('국가인권위원회')
-                if '추모식' in full_text:
-                    key_events.append('추모식 개최')
-                if '전시회' in full_text or '전시' in full_text:
-                    key_events.append('전시회 개최')
-                if '국정감사' in full_text:
-                    key_events.append('국정감사 논의')
-                if '증언집' in full_text or '번역' in full_text:
-                    key_events.append('증언집 발간')
-                if '성명' in full_text or '촉구' in full_text:
-                    key_events.append('성명서 발표')
-                if '실태조사' in full_text:
-                    key_events.append('실태조사 발표')
-                if '다큐멘터리' in full_text:
-                    key_events.append('다큐멘터리 제작')
-                if '기지촌' in full_text or '미군 위안부' in full_text:
-                    key_events.append('미군 위안부 이슈')
-                
-                # Extract locations
-                if '독일' in full_text or '베를린' in full_text:
-                    locations.append('독일')
-                if '서울' in full_text:
-                    locations.append('서울')
-                if '종로' in full_text:
-                    locations.append('종로구')
-                if '평택' in full_text:
-                    locations.append('평택')
-                if '의정부' in full_text:
-                    locations.append('의정부')
-                if '기지촌' in full_text:
-                    locations.append('미군기지 주변')
-                
-                # Extract publication date info
-                pub_date = article.get('published_date')
-                if pub_date:
-                    dates.append(pub_date)
+                tags = article.get('tags')
+                if tags is None:
+                    # Articles not from the store (e.g. search results) are tagged here
+                    tags = article_tags.extract_tags(article.get('title'), article.get('summary'), article.get('content'))
+                organizations.update(tags.get(article_tags.ORGANIZATION, ()))
+                key_events.update(tags.get(article_tags.EVENT, ()))
+                locations.update(tags.get(article_tags.LOCATION, ()))
             
             # Create specific, practical summary
             summary_parts = []
             
             # Lead with most recent significant event
             if key_events:
-                unique_events = list(set(key_events))
-                if '추모식 개최' in unique_events:
+                if '추모식 개최' in key_events:
                     summary_parts.append("정의기억연대가 위안부 피해자 기림의 날을 맞아 추모식을 개최했습니다.")
-                elif '전시회 개최' in unique_events and '독일' in locations:
+                elif '전시회 개최' in key_events and '독일' in locations:
                     summary_parts.append("독일 베를린에서 일본군 위안부 문제를 알리는 전시회가 열렸습니다.")
-                elif '국정감사 논의' in unique_events:
+                elif '국정감사 논의' in key_events:
                     summary_parts.append("국회 국정감사에서 위안부 문제 해결방안이 집중 논의됐습니다.")
-                elif '증언집 발간' in unique_events:
+                elif '증언집 발간' in key_events:
                     summary_parts.append("위안부 피해자 증언집이 새로운 언어로 번역 발간됐습니다.")
-                elif '성명서 발표' in unique_events:
+                elif '성명서 발표' in key_events:
                     summary_parts.append("시민단체들이 일본 정부의 공식 사과를 촉구하는 성명을 발표했습니다.")
             
             # Add context about scope and impact
             if locations:
-                unique_locations = list(set(locations))
-                if len(unique_locations) > 1:
+                if len(locations) > 1:
                     summary_parts.append("국내외에서 동시다발적으로 관련 활동이 진행되고 있으며,")
-                elif '독일' in unique_locations:
+                elif '독일' in locations:
                     summary_parts.append("국제적 연대 활동이 유럽까지 확산되고 있으며,")
             
             # Add organizational involvement
@@ -299,4 +269,68 @@ class VertexAISummaryService:
             
         except Exception as e:
             logging.error(f"Error generating fallback summary: {e}")
-            return "정의기억연대가 위안부 피해자 기림의 날 추모식을 개최하고, 국제사회의 지지 확산을 위한 다양한 활동이 진행되고 있습니다. 피해자 중심의 해결책 마련과 역사적 진실 규명을 위한 노력이 계속되고 있습니다."
\ No newline at end of file
+            return "정의기억연대가 위안부 피해자 기림의 날 추모식을 개최하고, 국제사회의 지지 확산을 위한 다양한 활동이 진행되고 있습니다. 피해자 중심의 해결책 마련과 역사적 진실 규명을 위한 노력이 계속되고 있습니다."
+
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+
+def get_summary_service() -> VertexAISummaryService:
+    """Return the process-wide summary service, creating it on first use"""
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = VertexAISummaryService()
+        return _shared_service
+
+
+class SummaryCache:
+    """Holds the precomputed front-page summary, keyed by a fingerprint of the summarized articles
+    
+    With `load`/`save` hooks the summary lives in shared storage instead of this
+    process, so worker processes that do not generate summaries can serve it:
+    load() returns (fingerprint, summary) and save(fingerprint, summary) stores it.
+    """
+    
+    def __init__(self, load=None, save=None):
+        self._fingerprint = None
+        self._summary = None
+        self._load = load
+        self._save = save
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_fingerprint(articles: List[Dict]) -> str:
+        """Fingerprint a list of articles by their URLs"""
+        return hashlib.sha1('\n'.join(article.get('url', '') for article in articles).encode('utf-8')).hexdigest()
+    
+    def current(self):
+        """Return (fingerprint, summary) of the cached summary"""
+        if self._load:
+            return self._load()
+        return self._fingerprint, self._summary
+    
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self.current()[0]
+    
+    def get(self) -> Optional[str]:
+        """Return the cached summary without generating anything"""
+        return self.current()[1]
+    
+    def refresh(self, articles: List[Dict]) -> bool:
+        """Regenerate the summary if the articles changed since the last run; returns True if regenerated"""
+        fingerprint = self.make_fingerprint(articles)
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return False
+            try:
+                summary = get_summary_service().generate_summary(articles)
+                if self._save:
+                    self._save(fingerprint, summary)
+                self._fingerprint, self._summary = fingerprint, summary
+                logging.info("Front-page summary regenerated")
+                return True
+            except Exception as e:
+                logging.error(f"Error refreshing front-page summary: {e}")
+                return False
@@ -1,5 +1,7 @@
 import os
 import logging
+import time
+from collections import Counter
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -7,8 +9,8 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging; DEBUG is very chatty during crawls, so production runs at INFO
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 class Base(DeclarativeBase):
     pass
@@ -27,61 +29,176 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Run background crawls and summary refreshes; disable for benchmarks and one-off scripts
+app.config["SCHEDULER_ENABLED"] = os.environ.get("SCHEDULER_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Configure the news scraper
+app.config["SCRAPER_MAX_WORKERS"] = int(os.environ.get("SCRAPER_MAX_WORKERS", 8))
+app.config["SCRAPER_HOST_DELAY"] = float(os.environ.get("SCRAPER_HOST_DELAY", 1.0))
+app.config["SCRAPER_CONNECT_TIMEOUT"] = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", 5))
+app.config["SCRAPER_READ_TIMEOUT"] = float(os.environ.get("SCRAPER_READ_TIMEOUT", 15))
+app.config["SCRAPER_RETRIES"] = int(os.environ.get("SCRAPER_RETRIES", 3))
+app.config["SCRAPER_BACKOFF"] = float(os.environ.get("SCRAPER_BACKOFF", 0.5))
+app.config["INGEST_BATCH_SIZE"] = int(os.environ.get("INGEST_BATCH_SIZE", 10))
+app.config["EXTRACTION_CACHE_PATH"] = os.environ.get("EXTRACTION_CACHE_PATH", os.path.join(app.instance_path, "extraction_cache.db"))
+app.config["EXTRACTION_CACHE_TTL_HOURS"] = float(os.environ.get("EXTRACTION_CACHE_TTL_HOURS", 24 * 7))
+app.config["EXTRACTION_CACHE_MAX_MB"] = float(os.environ.get("EXTRACTION_CACHE_MAX_MB", 64))
+
+# Adaptive polling: each source starts at the initial interval and is polled more
+# often while it yields new articles, less often while quiet or failing, within the bounds
+app.config["POLL_INITIAL_HOURS"] = float(os.environ.get("POLL_INITIAL_HOURS", 6))
+app.config["POLL_MIN_MINUTES"] = float(os.environ.get("POLL_MIN_MINUTES", 30))
+app.config["POLL_MAX_HOURS"] = float(os.environ.get("POLL_MAX_HOURS", 24))
+app.config["POLL_CHECK_MINUTES"] = float(os.environ.get("POLL_CHECK_MINUTES", 5))
+
+# Number of rendered pages kept in memory
+app.config["PAGE_CACHE_SIZE"] = int(os.environ.get("PAGE_CACHE_SIZE", 512))
+
+# Seconds a standby worker waits between attempts to take over the scheduler
+app.config["LEADER_RETRY_SECONDS"] = float(os.environ.get("LEADER_RETRY_SECONDS", 30))
+
 # Initialize the app with the extension
 db.init_app(app)
 
-# In-memory storage for articles (MVP version)
-articles_storage = []
-last_update = None
-
 with app.app_context():
     # Import models and routes
     import models
     import routes
+    import article_store
+    import metrics
     from news_scraper import NewsScraperService
+    from extraction_cache import ExtractionCache
+    from ai_summary_service import SummaryCache
+    from crawl_jobs import CrawlJobManager, CrawlRunStore
+    from source_polling import SourcePoller
+    from process_lock import ProcessLock, LeaderElection
+    
+    # Worker processes start concurrently; set up the schema and sample data one at a time
+    startup_lock = ProcessLock(db.engine, 'schema', app.instance_path)
     
     # Create database tables
-    db.create_all()
+    with startup_lock:
+        db.create_all()
+        article_store.ensure_schema()
+    
+    # Initialize news scraper with a persistent cache of extracted article text
+    extraction_cache = ExtractionCache(app.config["EXTRACTION_CACHE_PATH"],
+                                       ttl_seconds=app.config["EXTRACTION_CACHE_TTL_HOURS"] * 3600,
+                                       max_bytes=int(app.config["EXTRACTION_CACHE_MAX_MB"] * 1024 * 1024))
+    scraper = NewsScraperService(max_workers=app.config["SCRAPER_MAX_WORKERS"],
+                                 host_delay=app.config["SCRAPER_HOST_DELAY"],
+                                 extraction_cache=extraction_cache,
+                                 timeout=(app.config["SCRAPER_CONNECT_TIMEOUT"], app.config["SCRAPER_READ_TIMEOUT"]),
+                                 retries=app.config["SCRAPER_RETRIES"],
+                                 backoff_factor=app.config["SCRAPER_BACKOFF"])
     
-    # Initialize news scraper
-    scraper = NewsScraperService()
+    # Front-page summary, precomputed by the scheduler leader and served to every worker from the database
+    summary_cache = SummaryCache(load=article_store.load_summary, save=article_store.save_summary)
+    
+    def refresh_summary():
+        """Regenerate the cached front-page summary if the top articles changed"""
+        with app.app_context():
+            # Records carry the tags extracted at ingest; bodies are only loaded for articles
+            # without a summary, which the AI prompt describes by the start of their content
+            latest = article_store.get_latest_articles(0, 5)
+            contents = article_store.get_article_contents([article.id for article in latest if not article.summary])
+            for article in latest:
+                article.content = contents.get(article.id)
+            summary_cache.refresh([article.to_dict() for article in latest])
     
-    # Schedule periodic updates every 6 hours
+    # Schedule periodic updates of the sources that are due
     scheduler = BackgroundScheduler()
     
-    def update_news():
-        """Background task to update news articles"""
+    # Per-source polling intervals, adapted to each source's new articles, errors and poll time
+    source_poller = SourcePoller(scraper.source_names(),
+                                 initial_interval=app.config["POLL_INITIAL_HOURS"] * 3600,
+                                 min_interval=app.config["POLL_MIN_MINUTES"] * 60,
+                                 max_interval=app.config["POLL_MAX_HOURS"] * 3600)
+    
+    def url_is_stored(url):
+        """Exact stored-URL check confirming the seen-URL filter's positives, from scraper threads"""
         with app.app_context():
-            try:
-                logging.info("Starting scheduled news update...")
-                new_articles = scraper.scrape_all_sources()
-                
-                # Add new articles to storage (avoid duplicates)
-                existing_urls = {article['url'] for article in articles_storage}
-                for article in new_articles:
-                    if article['url'] not in existing_urls:
-                        articles_storage.append(article)
-                
-                # Keep only the latest 200 articles to manage memory
-                articles_storage.sort(key=lambda x: x['published_date'], reverse=True)
-                if len(articles_storage) > 200:
-                    articles_storage[:] = articles_storage[:200]
-                
-                global last_update
-                from datetime import datetime
-                last_update = datetime.now()
-                
-                logging.info(f"News update completed. Total articles: {len(articles_storage)}")
-            except Exception as e:
-                logging.error(f"Error during scheduled news update: {e}")
-    
-    # Schedule updates every 6 hours
-    scheduler.add_job(func=update_news, trigger="interval", hours=6, id='news_update')
+            return article_store.url_exists(url)
+    
+    def run_news_update(progress=None, source_names=None):
+        """Scrape the named sources (all by default) and merge the results into the store; returns (added, total)"""
+        # Articles are committed in small batches while the crawl continues, so
+        # they become visible without waiting for the slowest source
+        added_count = 0
+        added_sources = Counter()
+        polls = {}
+        batch = []
+        
+        def source_done(name, article_count, error_count, seconds):
+            polls[name] = (error_count, seconds)
+        
+        # Stored URLs, so the scraper only downloads new articles; loaded on the first
+        # crawl and rebuilt once the filter holds more URLs than it was sized for
+        if scraper.seen_urls is None or scraper.seen_urls.is_full:
+            scraper.seen_urls = article_store.load_seen_urls(confirm=url_is_stored)
+        
+        # Sources being crawled are not due again while this crawl runs, so they are not queued twice
+        source_poller.start(scraper.source_names() if source_names is None else source_names)
+        
+        # Recently stored articles, so syndicated copies of them are merged instead of downloaded
+        known_fingerprints = article_store.recent_fingerprints()
+        for article in scraper.iter_articles(progress=progress, known_fingerprints=known_fingerprints,
+                                             sources=source_names, source_done=source_done):
+            batch.append(article)
+            if len(batch) >= app.config["INGEST_BATCH_SIZE"]:
+                # Upsert into the database (duplicates are matched by URL)
+                added_count += article_store.save_articles(batch, added_sources=added_sources)
+                scraper.seen_urls.update(item['url'] for item in batch if not item.get('duplicate_of'))
+                batch = []
+        added_count += article_store.save_articles(batch, added_sources=added_sources)
+        scraper.seen_urls.update(item['url'] for item in batch if not item.get('duplicate_of'))
+        total_articles = article_store.count_articles()
+        
+        # Schedule each polled source's next poll from how many new articles it produced
+        for name, (error_count, seconds) in polls.items():
+            source_poller.record(name, added_sources[name], error_count, seconds)
+        
+        logging.info(f"News update completed. Added {added_count} new articles. Total articles: {total_articles}")
+        
+        # Regenerate the front-page summary in the background
+        scheduler.add_job(func=refresh_summary, trigger="date")
+        return added_count, total_articles
+    
+    def run_crawl_job(job):
+        """Run one crawl job from the job manager's background thread"""
+        status = 'failed'
+        start = time.perf_counter()
+        try:
+            with app.app_context():
+                added_count, total_articles = run_news_update(progress=job.update_source, source_names=job.source_names)
+            status = 'completed'
+            metrics.ARTICLES_ADDED.inc(added_count)
+            metrics.ARTICLES_STORED.set(total_articles)
+            return added_count, total_articles
+        finally:
+            metrics.CRAWL_SECONDS.observe(time.perf_counter() - start, status=status)
+    
+    # Crawls run one at a time in the scheduler process; manual and scheduled requests
+    # join a running crawl, and other workers queue theirs in the database
+    crawl_jobs = CrawlJobManager(run_crawl_job, store=CrawlRunStore(app))
+    crawl_jobs.runs_crawls = not app.config["SCHEDULER_ENABLED"]
+    
+    def update_news():
+        """Background task to update the news sources that are due for polling"""
+        due = source_poller.due()
+        if not due:
+            return
+        logging.info(f"Starting scheduled news update of {', '.join(due)}...")
+        job, started = crawl_jobs.submit(trigger='scheduled', source_names=due)
+        if job.status == 'queued':
+            logging.info(f"News update queued as job {job.id} to run after the current crawl")
+        elif not started:
+            logging.info(f"News update already running as job {job.id}, not starting another")
     
     # Add some sample articles for testing if no articles exist
     def add_sample_articles():
         """Add sample articles for testing purposes"""
-        if len(articles_storage) == 0:
+        if article_store.count_articles() == 0:
             from datetime import datetime, timedelta
             sample_articles = [
                 {
@@ -149,20 +266,40 @@ with app.app_context():
                 }
             ]
             
-            articles_storage.extend(sample_articles)
-            global last_update
-            last_update = datetime.now()
+            article_store.save_articles(sample_articles)
             logging.info(f"Added {len(sample_articles)} sample articles for demonstration")
     
     # Add sample articles first
-    add_sample_articles()
-    
-    # Schedule an immediate job to scrape articles after startup
-    scheduler.add_job(func=update_news, trigger="date", id='initial_scrape')
-    
-    scheduler.start()
+    with startup_lock:
+        add_sample_articles()
     
-    logging.info("Application started. Sample articles loaded, real news scraping will begin in background...")
+    def start_scheduler():
+        """Run the crawls and summary refreshes in this process, once elected leader"""
+        crawl_jobs.runs_crawls = True
+        
+        # Schedule immediate jobs to summarize the current articles and scrape all sources after startup
+        scheduler.add_job(func=refresh_summary, trigger="date", id='initial_summary')
+        scheduler.add_job(func=crawl_jobs.submit, trigger="date", kwargs={'trigger': 'scheduled'}, id='initial_scrape')
+        
+        # Check regularly which sources are due for polling
+        scheduler.add_job(func=update_news, trigger="interval", minutes=app.config["POLL_CHECK_MINUTES"], id='news_update')
+        
+        # Pick up crawls requested by other workers and publish the progress of the running one
+        scheduler.add_job(func=crawl_jobs.process_requests, trigger="interval", seconds=5, id='crawl_requests')
+        
+        scheduler.start()
+        
+        logging.info("Scheduler started. Real news scraping will begin in background...")
+        
+        # Shut down the scheduler when exiting the app
+        atexit.register(lambda: scheduler.shutdown())
     
-    # Shut down the scheduler when exiting the app
-    atexit.register(lambda: scheduler.shutdown())
+    if app.config["SCHEDULER_ENABLED"]:
+        # With several worker processes only the one holding the lock runs the scheduler
+        leader_election = LeaderElection(ProcessLock(db.engine, 'scheduler', app.instance_path), start_scheduler,
+                                         retry_seconds=app.config["LEADER_RETRY_SECONDS"])
+        leader_election.start()
+        
+        logging.info("Application started. Sample articles loaded")
+    else:
+        logging.info("Application started with the scheduler disabled")
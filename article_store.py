@@ -0,0 +1,485 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func, inspect, literal_column, select, text, tuple_
+from sqlalchemy.orm import defer
+from app import db
+from models import Article, ArticleRecord, FacetCount, StoreState
+import search_index
+import near_duplicates
+import article_tags
+from url_filter import SeenUrlFilter
+
+# Number of articles upserted per transaction
+BATCH_SIZE = 100
+
+# Keyword searches rank and count at most this many matches, the newest ones
+SEARCH_MAX_RESULTS = 1000
+
+# Articles read per query by streaming exports
+EXPORT_BATCH_SIZE = 500
+
+# Smallest number of URLs a seen-URL filter is sized for; it is rebuilt once it fills up
+SEEN_URLS_MIN_CAPACITY = 10000
+
+# Seconds a worker process reuses the shared store state before reading it again
+STATE_POLL_SECONDS = 2.0
+
+# (monotonic read time, state dict) of the last read of the store_state row
+_state_cache = None
+
+ARTICLE_FIELDS = ('title', 'summary', 'content', 'source', 'published_date', 'category')
+
+# Fields refreshed when an already stored URL is scraped again; the first seen
+# publication date is kept because scrapers fall back to the crawl time
+UPDATABLE_FIELDS = ('title', 'summary', 'content', 'source', 'category', 'tags')
+
+# How far back stored articles are checked for near duplicates of new ones
+DUPLICATE_WINDOW_DAYS = 7
+
+# Indexes of earlier schemas that newer ones cover: (published_date) is a prefix of (published_date, id)
+REDUNDANT_INDEXES = ('ix_article_published_date',)
+
+
+def _add_missing_columns():
+    """Add article columns introduced after the table was created"""
+    present = {column['name'] for column in inspect(db.engine).get_columns(Article.__tablename__)}
+    for column in Article.__table__.columns:
+        if column.name not in present:
+            logging.info(f"Adding column {Article.__tablename__}.{column.name}")
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {Article.__tablename__} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
+
+
+def ensure_schema():
+    """Create columns and indexes that db.create_all() skips on already existing tables"""
+    _add_missing_columns()
+    for index in Article.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+    for name in REDUNDANT_INDEXES:
+        db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    db.session.commit()
+    if db.session.get(StoreState, 1) is None:
+        db.session.add(StoreState(id=1, version=0))
+        db.session.commit()
+    search_index.ensure_search_index()
+    tagged = _backfill_tags()
+    ensure_facet_counts(rebuild=tagged > 0)
+
+
+def _article_tags(title, summary, content):
+    """Encoded tags of an article, extracted in one pass over its text"""
+    return article_tags.encode_tags(article_tags.extract_tags(title, summary, content))
+
+
+def _backfill_tags(batch_size=BATCH_SIZE):
+    """Extract the tags of articles stored before tags existed; returns how many were tagged"""
+    tagged = 0
+    while True:
+        batch = Article.query.filter(Article.tags.is_(None)).limit(batch_size).all()
+        if not batch:
+            break
+        for article in batch:
+            article.tags = _article_tags(article.title, article.summary, article.content)
+        db.session.commit()
+        tagged += len(batch)
+    if tagged:
+        logging.info(f"Extracted tags of {tagged} stored articles")
+    return tagged
+
+
+def _facet_values(article):
+    """Return the (facet, value) keys an article is counted under in the facet_count table
+    
+    The facets are category, source, day, total (with the single value '') and
+    one per tag kind in article_tags.TAG_KINDS.
+    """
+    published_date = article.published_date
+    keys = [
+        ('category', article.category or ''),
+        ('source', article.source or ''),
+        ('day', published_date.strftime('%Y-%m-%d') if published_date else ''),
+        ('total', '')
+    ]
+    for kind, tags in article_tags.decode_tags(article.tags).items():
+        keys.extend((kind, tag) for tag in tags)
+    return keys
+
+
+def _apply_facet_deltas(deltas):
+    """Add the given per-(facet, value) deltas to the stored counters in the current transaction"""
+    for (facet, value), delta in deltas.items():
+        if not delta:
+            continue
+        updated = FacetCount.query.filter_by(facet=facet, value=value).update(
+            {FacetCount.count: FacetCount.count + delta}, synchronize_session=False
+        )
+        if not updated:
+            db.session.add(FacetCount(facet=facet, value=value, count=delta))
+
+
+def ensure_facet_counts(rebuild=False):
+    """Rebuild the facet counters from the article table if they are missing or out of step"""
+    counted = db.session.query(FacetCount.count).filter_by(facet='total', value='').scalar()
+    total = db.session.query(func.count(Article.id)).scalar()
+    if counted == total and not rebuild:
+        return
+    
+    logging.info(f"Rebuilding facet counts ({counted} counted, {total} articles)")
+    FacetCount.query.delete()
+    db.session.add(FacetCount(facet='total', value='', count=total))
+    deltas = Counter()
+    for facet, column in (('category', Article.category), ('source', Article.source)):
+        for value, count in db.session.query(column, func.count(Article.id)).group_by(column):
+            deltas[(facet, value or '')] += count
+    for published_date, tags in db.session.query(Article.published_date, Article.tags).yield_per(1000):
+        deltas[('day', published_date.strftime('%Y-%m-%d') if published_date else '')] += 1
+        for kind, values in article_tags.decode_tags(tags).items():
+            deltas.update((kind, tag) for tag in values)
+    _apply_facet_deltas(deltas)
+    db.session.commit()
+
+
+def _fingerprint(data):
+    """Signed SimHash of a scraped article dict, reusing the one the scraper computed"""
+    value = data.get('simhash')
+    if value is None:
+        value = near_duplicates.fingerprint(data.get('title'), data.get('summary'))
+    return near_duplicates.to_signed(value) if value is not None else None
+
+
+def get_state(max_age=STATE_POLL_SECONDS):
+    """Return the shared store state (version, last_update, summary, summary_fingerprint)
+    
+    The row is read at most every max_age seconds per process, so every worker
+    notices new versions written by the crawling process within that time.
+    """
+    global _state_cache
+    now = time.monotonic()
+    cached = _state_cache
+    if cached is not None and now - cached[0] < max_age:
+        return cached[1]
+    # Column query, so a state object already loaded in this session is not reused
+    row = db.session.execute(
+        select(StoreState.version, StoreState.last_update, StoreState.summary, StoreState.summary_fingerprint)
+        .where(StoreState.id == 1)
+    ).first()
+    state = row._asdict() if row else {'version': 0, 'last_update': None, 'summary': None, 'summary_fingerprint': None}
+    _state_cache = (now, state)
+    return state
+
+
+def _update_state(**values):
+    """Update the shared state in the current transaction; the version is always incremented"""
+    values['version'] = StoreState.version + 1
+    StoreState.query.filter_by(id=1).update(values, synchronize_session=False)
+
+
+def _invalidate_state():
+    """Make the next get_state() in this process read the committed state"""
+    global _state_cache
+    _state_cache = None
+
+
+def get_last_update():
+    """Return the time of the last completed ingest, shown in the page footer and /api/stats"""
+    return get_state()['last_update']
+
+
+def load_summary():
+    """Return (fingerprint, summary) of the stored front-page summary"""
+    state = get_state()
+    return state['summary_fingerprint'], state['summary']
+
+
+def save_summary(fingerprint, summary):
+    """Store the front-page summary for all worker processes"""
+    _update_state(summary=summary, summary_fingerprint=fingerprint)
+    db.session.commit()
+    _invalidate_state()
+
+
+def save_articles(articles, batch_size=BATCH_SIZE, added_sources=None):
+    """Upsert scraped article dicts into the database in batches, returning how many were new
+    
+    If `added_sources` (a Counter) is given, the new articles are also counted in it by source.
+    Each batch costs one indexed URL lookup plus writes for new or changed
+    articles only; unchanged articles are neither rewritten nor reindexed.
+    Near-duplicate records ({'url', 'source', 'duplicate_of'}) and an article's
+    'also_published' list are merged into the stored article instead of adding rows.
+    """
+    added_count = 0
+    
+    for start in range(0, len(articles), batch_size):
+        items = articles[start:start + batch_size]
+        batch = {article['url']: article for article in items if not article.get('duplicate_of')}
+        merges = [article for article in items if article.get('duplicate_of')]
+        try:
+            urls = set(batch) | {merge['duplicate_of'] for merge in merges}
+            existing = {
+                article.url: article
+                for article in Article.query.filter(Article.url.in_(list(urls))).all()
+            }
+            saved = []
+            # New articles and those whose indexed fields change, with the {id: indexed values}
+            # of the latter before the change, which the contentless index needs to replace them
+            indexed = []
+            reindexed = {}
+            merged = 0
+            added = Counter()
+            facet_deltas = Counter()
+            for url, data in batch.items():
+                fields = {field: data.get(field) for field in ARTICLE_FIELDS}
+                fields['title'] = (fields['title'] or '')[:500]
+                fields['tags'] = _article_tags(fields['title'], fields['summary'], fields['content'])
+                simhash = _fingerprint(data)
+                article = existing.get(url)
+                if article is None:
+                    article = Article(url=url, simhash=simhash, **fields)
+                    db.session.add(article)
+                    existing[url] = article
+                    added[article.source] += 1
+                    facet_deltas.update(_facet_values(article))
+                    saved.append(article)
+                    indexed.append(article)
+                else:
+                    article.simhash = simhash
+                    changed = {field: fields[field] for field in UPDATABLE_FIELDS
+                               if getattr(article, field) != fields[field]}
+                    if changed:
+                        if any(field in changed for field in search_index.INDEXED_FIELDS):
+                            reindexed[article.id] = search_index.indexed_values(article)
+                            indexed.append(article)
+                        facet_deltas.subtract(_facet_values(article))
+                        for field, value in changed.items():
+                            setattr(article, field, value)
+                        facet_deltas.update(_facet_values(article))
+                        saved.append(article)
+                for copy in data.get('also_published') or ():
+                    merged += article.add_also_published(copy['source'], copy['url'])
+            
+            for merge in merges:
+                article = existing.get(merge['duplicate_of'])
+                if article is None:
+                    logging.info(f"Dropping near duplicate {merge['url']}: {merge['duplicate_of']} is not stored")
+                    continue
+                merged += article.add_also_published(merge['source'], merge['url'])
+            
+            # Flush to assign ids, then update the full-text index and facet counters in the same transaction
+            db.session.flush()
+            search_index.index_articles(indexed, reindexed)
+            _apply_facet_deltas(facet_deltas)
+            if saved or merged:
+                _update_state()
+            db.session.commit()
+            _invalidate_state()
+            added_count += sum(added.values())
+            if added_sources is not None:
+                added_sources.update(added)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error saving article batch: {e}")
+    
+    try:
+        _update_state(last_update=datetime.now())
+        db.session.commit()
+        _invalidate_state()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error updating store state: {e}")
+    return added_count
+
+
+def recent_fingerprints(days=DUPLICATE_WINDOW_DAYS):
+    """Return (fingerprint, url, title) of articles published in the last days, for near-duplicate checks
+    
+    Articles stored before fingerprints existed get theirs computed and saved here.
+    """
+    since = datetime.now() - timedelta(days=days)
+    rows = Article.query.options(defer(Article.content_text), defer(Article.content_compressed)).filter(
+        Article.published_date >= since).all()
+    fingerprints = []
+    for article in rows:
+        if article.simhash is None:
+            article.simhash = _fingerprint({'title': article.title, 'summary': article.summary})
+        if article.simhash is not None:
+            fingerprints.append((near_duplicates.from_signed(article.simhash), article.url, article.title))
+    db.session.commit()
+    return fingerprints
+
+
+def _listing_query():
+    """Rows of listing columns newest first, without the article bodies; see ArticleRecord"""
+    return db.session.query(*ArticleRecord.columns).order_by(Article.published_date.desc(), Article.id.desc())
+
+
+def get_latest_articles(offset=0, limit=10):
+    """Return a page of ArticleRecords ordered by publication date"""
+    return [ArticleRecord(*row) for row in _listing_query().offset(offset).limit(limit)]
+
+
+def url_exists(url):
+    """Return True if an article is stored under the given URL"""
+    return db.session.query(Article.id).filter(Article.url == url).first() is not None
+
+
+def load_seen_urls(confirm=None):
+    """Return a SeenUrlFilter of all stored article URLs, with room for as many again"""
+    seen_urls = SeenUrlFilter(max(SEEN_URLS_MIN_CAPACITY, 2 * count_articles()), confirm=confirm)
+    seen_urls.update(url for url, in db.session.query(Article.url).yield_per(1000))
+    return seen_urls
+
+
+def get_article_contents(ids):
+    """Return {id: content} of the given articles, decompressing only their bodies"""
+    if not ids:
+        return {}
+    rows = db.session.query(Article.id, Article.content_text, Article.content_compressed).filter(Article.id.in_(ids))
+    return {article_id: Article.decode_content(content_text, compressed) for article_id, content_text, compressed in rows}
+
+
+def get_article_by_url(url):
+    """Return the article stored under the given URL, or None"""
+    return Article.query.filter_by(url=url).first()
+
+
+def get_facet_counts(facet):
+    """Return the maintained {value: count} counters of a facet, without scanning articles"""
+    return {
+        row.value: row.count
+        for row in FacetCount.query.filter(FacetCount.facet == facet, FacetCount.count > 0)
+    }
+
+
+def count_articles():
+    """Return the total number of stored articles"""
+    return get_facet_counts('total').get('', 0)
+
+
+def search_articles(query='', category='', source='', offset=0, limit=10):
+    """Return (page of ArticleRecords, total) of articles matching the keyword, category and source filters
+    
+    A keyword search considers only the newest SEARCH_MAX_RESULTS matches, read
+    in (published_date, id) index order, and ranks those by BM25 relevance
+    weighted by recency where the search index is available, or lists them
+    newest first otherwise. Its total is capped: SEARCH_MAX_RESULTS + 1 means more.
+    """
+    if query:
+        matches = _facet_filters(db.session.query(Article.id).filter(_keyword_condition(query)), category, source)
+        ids = [article_id for article_id, in matches.order_by(
+            Article.published_date.desc(), Article.id.desc()).limit(SEARCH_MAX_RESULTS + 1)]
+        ids, total = ids[:SEARCH_MAX_RESULTS], len(ids)
+        ranked = search_index.ranked_matches(query, ids)
+        if ranked is not None:
+            results = _listing_query().join(ranked, Article.id == ranked.c.rowid).order_by(None).order_by(
+                search_index.rank_order(ranked.c.score, Article.published_date), Article.id.desc())
+        else:
+            results = _listing_query().filter(Article.id.in_(ids))
+        return [ArticleRecord(*row) for row in results.offset(offset).limit(limit)], total
+    
+    results = _facet_filters(_listing_query(), category, source)
+    
+    # Single-facet filters are answered from the counters instead of a COUNT over the matches
+    if category and source:
+        total = results.order_by(None).count()
+    elif category:
+        total = get_facet_counts('category').get(category, 0)
+    elif source:
+        total = get_facet_counts('source').get(source, 0)
+    else:
+        total = count_articles()
+    return [ArticleRecord(*row) for row in results.offset(offset).limit(limit)], total
+
+
+def search_snippets(query, articles):
+    """Return {article id: [(text, highlighted)]} highlight snippets for a page of search results
+    
+    The query words are highlighted in the article's summary, or for articles
+    that match in the body alone, around the first mention in the body. The
+    contentless index keeps no text to cut snippets from, so only the bodies of
+    those few articles on the page are loaded.
+    """
+    if not query:
+        return {}
+    result = {}
+    body_only = []
+    for article in articles:
+        segments = search_index.highlight(article.summary, query)
+        if segments:
+            result[article.id] = segments
+        else:
+            body_only.append(article.id)
+    for article_id, content in get_article_contents(body_only).items():
+        segments = search_index.highlight(content, query)
+        if segments:
+            result[article_id] = segments
+    return result
+
+
+def get_article_page(query='', category='', source='', after=None, limit=50, with_content=False):
+    """Return up to limit ArticleRecords newest first, after the (published_date, id) key `after`
+    
+    Keyset pagination: each page seeks on the (published_date, id) index from the
+    last key of the previous page instead of skipping rows, so deep pages cost
+    the same as the first. Filters are those of search_articles; keyword matches
+    keep the date order here.
+    """
+    columns = ArticleRecord.columns
+    if with_content:
+        columns += (Article.content_text, Article.content_compressed)
+    results = db.session.query(*columns).order_by(Article.published_date.desc(), Article.id.desc())
+    if query:
+        results = results.filter(_keyword_condition(query))
+    results = _facet_filters(results, category, source)
+    if after is not None:
+        results = results.filter(tuple_(Article.published_date, Article.id) < tuple_(*after))
+    
+    page = []
+    for row in results.limit(limit):
+        content = Article.decode_content(*row[len(ArticleRecord.columns):]) if with_content else None
+        page.append(ArticleRecord(*row[:len(ArticleRecord.columns)], content=content))
+    return page
+
+
+def iter_article_records(query='', category='', source='', with_content=False, batch_size=EXPORT_BATCH_SIZE):
+    """Yield every matching ArticleRecord newest first, reading one keyset page at a time"""
+    after = None
+    while True:
+        page = get_article_page(query, category, source, after, batch_size, with_content)
+        # End the read transaction between pages so a long export does not pin a snapshot
+        db.session.rollback()
+        yield from page
+        if len(page) < batch_size:
+            return
+        after = (page[-1].published_date, page[-1].id)
+
+
+def _keyword_condition(query):
+    """Filter condition for articles matching the keyword, using the search index where available"""
+    matching_ids = search_index.matching_ids(query)
+    if matching_ids is not None:
+        # '+id' keeps SQLite from driving the query from the match list and sorting every match;
+        # it walks the (published_date, id) index newest first instead and stops at the limit
+        return literal_column(f'+{Article.__tablename__}.id').in_(matching_ids)
+    pattern = f"%{query}%"
+    return Article.title.ilike(pattern) | Article.summary.ilike(pattern) | Article.content_text.ilike(pattern)
+
+
+def _facet_filters(results, category='', source=''):
+    if category:
+        results = results.filter(Article.category == category)
+    if source:
+        results = results.filter(Article.source == source)
+    return results
+
+
+def get_categories():
+    """Return the distinct article categories"""
+    return sorted(value for value in get_facet_counts('category') if value)
+
+
+def get_sources():
+    """Return the distinct article sources"""
+    return sorted(value for value in get_facet_counts('source') if value)
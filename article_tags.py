@@ -0,0 +1,62 @@
+import json
+from keyword_matcher import KeywordMatcher
+
+# Tag kinds, also used as facet names for the tag counters
+ORGANIZATION = 'organization'
+EVENT = 'event'
+LOCATION = 'location'
+TAG_KINDS = (ORGANIZATION, EVENT, LOCATION)
+
+# {kind: {tag: keywords}}; an article gets a tag when its text contains any of the keywords
+TAG_RULES = {
+    ORGANIZATION: {
+        '정의기억연대': ('정의기억연대', '정의연'),
+        '국가인권위원회': ('국가인권위원회',),
+    },
+    EVENT: {
+        '추모식 개최': ('추모식',),
+        '전시회 개최': ('전시',),
+        '국정감사 논의': ('국정감사',),
+        '증언집 발간': ('증언집', '번역'),
+        '성명서 발표': ('성명', '촉구'),
+        '실태조사 발표': ('실태조사',),
+        '다큐멘터리 제작': ('다큐멘터리',),
+        '미군 위안부 이슈': ('기지촌', '미군 위안부'),
+    },
+    LOCATION: {
+        '독일': ('독일', '베를린'),
+        '서울': ('서울',),
+        '종로구': ('종로',),
+        '평택': ('평택',),
+        '의정부': ('의정부',),
+        '미군기지 주변': ('기지촌',),
+    },
+}
+
+# keyword -> [(kind, tag)] it implies
+_KEYWORD_TAGS = {}
+for _kind, _tags in TAG_RULES.items():
+    for _tag, _keywords in _tags.items():
+        for _keyword in _keywords:
+            _KEYWORD_TAGS.setdefault(_keyword.lower(), []).append((_kind, _tag))
+
+_matcher = KeywordMatcher(_KEYWORD_TAGS)
+
+
+def extract_tags(*texts):
+    """Return {kind: sorted tags} found in the texts, scanning each once for all keywords"""
+    found = {}
+    for text in texts:
+        for keyword in _matcher.find_all(text):
+            for kind, tag in _KEYWORD_TAGS[keyword]:
+                found.setdefault(kind, set()).add(tag)
+    return {kind: sorted(found[kind]) for kind in TAG_KINDS if kind in found}
+
+
+def encode_tags(tags):
+    """Serialize tags for the article's tags column; an article without tags stores {}"""
+    return json.dumps(tags, ensure_ascii=False, sort_keys=True)
+
+
+def decode_tags(value):
+    return json.loads(value) if value else {}
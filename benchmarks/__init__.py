@@ -0,0 +1 @@
+"""Offline benchmarks for the scraper and the web routes, run with `python -m benchmarks.<name>`"""
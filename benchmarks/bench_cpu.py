@@ -0,0 +1,60 @@
+"""CPU cost of filtering and parsing on recorded pages, without any network: python -m benchmarks.bench_cpu"""
+import argparse
+import logging
+import tempfile
+import feedparser
+import trafilatura
+from benchmarks import timing
+from benchmarks.bench_scraper import load_corpus
+from news_scraper import NewsScraperService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark relevance filtering and content extraction')
+    parser.add_argument('--corpus', help='recorded corpus directory (default: synthetic corpus)')
+    parser.add_argument('--repeat', type=int, default=5)
+    timing.add_output_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    scraper = NewsScraperService()
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = load_corpus(args.corpus, directory)
+        feeds = [body for _, body in corpus.iter_bodies('feed')]
+        searches = [(site, body) for url, body in corpus.iter_bodies('search')
+                    for site in scraper.news_sites if url.startswith(site['search_url'])]
+        pages = [body for _, body in corpus.iter_bodies('article')]
+    
+    # Texts the relevance filter sees: feed titles/summaries and extracted article bodies
+    entries = [(entry.get('title', ''), entry.get('summary', ''))
+               for body in feeds for entry in feedparser.parse(body).entries]
+    texts = [('', trafilatura.extract(page)) for page in pages[:200]]
+    
+    benchmarks = {
+        'feedparser.parse': (feeds, lambda body: feedparser.parse(body)),
+        'is_relevant_article[feed entry]': (entries, lambda entry: scraper.is_relevant_article(*entry)),
+        'is_relevant_article[article body]': (texts, lambda text: scraper.is_relevant_article(*text)),
+        'matched_keywords[article body]': (texts, lambda text: scraper.matched_keywords(*text)),
+        'extract_result_links': (searches, lambda search: scraper.extract_result_links(*search, set())),
+        'trafilatura.extract': (pages[:200], lambda page: trafilatura.extract(page))
+    }
+    
+    results = {}
+    for name, (items, func) in benchmarks.items():
+        if not items:
+            continue
+        
+        def run():
+            for item in items:
+                func(item)
+        
+        stats = timing.measure(run, repeat=args.repeat)
+        # Per-item cost, so results stay comparable across corpus sizes
+        results[name] = {key: value / len(items) if key.endswith('_ms') else value for key, value in stats.items()}
+        results[name]['items'] = len(items)
+    
+    raise SystemExit(timing.finish(results, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Latency of the main pages at growing store sizes: python -m benchmarks.bench_routes
+
+Each route is timed rendered from the database, with the page cache cleared
+before every request, and separately as a page cache hit ('cached').
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from benchmarks import timing
+from benchmarks.corpus import synthetic_articles
+
+ROUTES = [
+    '/',
+    '/?page=20',
+    '/search?q=위안부',
+    '/search?q=위안부&category=Politics',
+    '/search?source=한겨레',
+    '/archive',
+    '/archive?page=20',
+    '/api/stats'
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page latency for growing article counts')
+    parser.add_argument('--sizes', default='200,1000,10000,100000',
+                        help='comma-separated article counts, measured in increasing order')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database', help='SQLite file to build the store in (default: a scratch file)')
+    timing.add_output_arguments(parser)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    
+    directory = tempfile.mkdtemp(prefix='bench-routes-')
+    database = args.database or os.path.join(directory, 'bench.db')
+    # The app reads its configuration at import time
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(database)}'
+    os.environ['EXTRACTION_CACHE_PATH'] = os.path.join(directory, 'extraction_cache.db')
+    os.environ['SCHEDULER_ENABLED'] = '0'
+    
+    from app import app
+    import article_store
+    from routes import page_cache
+    logging.getLogger().setLevel(logging.WARNING)
+    client = app.test_client()
+    
+    results = {}
+    with app.app_context():
+        for size in sizes:
+            # Grow the store to the next size through the regular ingest path
+            missing = size - article_store.count_articles()
+            start = time.perf_counter()
+            for offset in range(0, max(missing, 0), 1000):
+                article_store.save_articles(synthetic_articles(size - missing + offset, min(1000, missing - offset)))
+            if missing > 0:
+                elapsed = time.perf_counter() - start
+                results[f'save_articles[n={size}]'] = {'articles': missing,
+                                                       'articles_per_second': missing / elapsed}
+            
+            for route in ROUTES:
+                def get():
+                    response = client.get(route)
+                    assert response.status_code == 200, f'{route} returned {response.status_code}'
+                
+                def get_uncached():
+                    page_cache.clear()
+                    get()
+                
+                results[f'GET {route} [n={size}]'] = timing.measure(get_uncached, repeat=args.repeat, warmup=2)
+                results[f'GET {route} cached [n={size}]'] = timing.measure(get, repeat=args.repeat, warmup=2)
+    
+    raise SystemExit(timing.finish(results, args))
+
+
+if __name__ == '__main__':
+    main()
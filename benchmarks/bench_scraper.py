@@ -0,0 +1,57 @@
+"""Crawl throughput against the local replay server: python -m benchmarks.bench_scraper"""
+import argparse
+import logging
+import tempfile
+import time
+from benchmarks.corpus import Corpus, generate_synthetic
+from benchmarks.replay_server import ReplayServer
+from benchmarks import timing
+from news_scraper import NewsScraperService
+
+
+def load_corpus(path, directory):
+    """Open a recorded corpus, or generate the synthetic one into a scratch directory"""
+    if path:
+        return Corpus(path)
+    return generate_synthetic(NewsScraperService(), directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scrape_all_sources against recorded fixtures')
+    parser.add_argument('--corpus', help='recorded corpus directory (default: synthetic corpus)')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--host-delay', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    timing.add_output_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        server = ReplayServer(load_corpus(args.corpus, directory), latency=args.latency, jitter=args.jitter).start()
+        try:
+            runs = []
+            
+            def crawl():
+                # A fresh scraper per run: no warm connections, feed validators or cached extractions
+                scraper = NewsScraperService(max_workers=args.workers, host_delay=args.host_delay)
+                server.point_scraper_at(scraper)
+                server.reset_stats()
+                start = time.perf_counter()
+                articles = scraper.scrape_all_sources()
+                runs.append((time.perf_counter() - start, len(articles), server.requests, server.bytes_sent))
+            
+            stats = timing.measure(crawl, repeat=args.repeat, warmup=0)
+            seconds, articles, requests, bytes_sent = sorted(runs)[len(runs) // 2]
+            stats.update(articles=articles, requests=requests, kilobytes=bytes_sent / 1024,
+                         articles_per_second=articles / seconds if seconds else 0.0)
+            results = {f'scrape_all_sources[workers={args.workers},latency={args.latency}]': stats}
+        finally:
+            server.stop()
+    
+    raise SystemExit(timing.finish(results, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import json
+import os
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.parse import quote_plus, unquote, urlparse
+from xml.sax.saxutils import escape
+
+MANIFEST = 'manifest.json'
+
+# Sentences used to build synthetic article bodies and summaries
+FILLER_SENTENCES = [
+    '정부는 이날 관계 부처 합동 회의를 열고 후속 대책을 논의했다고 밝혔다.',
+    '전문가들은 장기적인 관점에서 제도 개선이 필요하다고 지적했다.',
+    '시민단체 관계자는 기자회견에서 진상 규명을 거듭 촉구했다.',
+    '이번 행사에는 지역 주민과 학생 등 300여 명이 참석했다.',
+    '국회는 다음 달 본회의에서 관련 법안을 처리할 예정이다.',
+    '현지 언론은 양국 관계에 미칠 영향에 주목하고 있다.',
+    '올해 예산안에는 관련 사업비가 전년보다 12% 늘어난 규모로 반영됐다.',
+    '법원은 원고의 청구를 일부 받아들여 배상 책임을 인정했다.',
+    'The ministry said it would release a detailed report later this month.',
+    'Officials declined to comment on the timing of the next round of talks.'
+]
+
+UNRELATED_TITLES = [
+    '수도권 아파트값 3주 연속 상승', '프로야구 개막전 매진 행렬', '내일 전국 흐리고 곳곳 비',
+    '반도체 수출 회복세 이어가', '신작 드라마 시청률 두 자릿수 돌파', '전기차 보조금 기준 개편',
+    '대학 등록금 동결 기조 유지', '지방선거 후보 등록 마감', 'Stocks close higher on tech rally'
+]
+
+RELEVANT_TITLE_TEMPLATES = [
+    '{keyword} 피해자 추모식 열려', '{keyword} 문제 해결 촉구 성명 발표', '{keyword} 관련 새 자료 공개',
+    '{keyword} 증언집 번역본 발간', '국회서 {keyword} 지원 법안 논의', 'Survivors of {keyword} honored in Seoul'
+]
+
+# Article link paths tried in order; the first one matching a site's article_url_pattern is used
+ARTICLE_PATH_TEMPLATES = [
+    '/national/2024/05/{day:02d}/ARTICLE{n:06d}/',
+    '/news/Society/article/all/20240510/{n}/1',
+    '/news/endPage.do?news_id=N{n:010d}',
+    '/article/{n}'
+]
+
+
+def normalize_url(url):
+    """Lookup key of a URL, so percent-encoded and raw forms of the same URL match"""
+    return unquote(url)
+
+
+class Corpus:
+    """Recorded HTTP responses keyed by URL, stored as one body file per response plus a manifest
+    
+    Each entry records the status, content type, ETag and kind ('feed', 'search'
+    or 'article') of the response.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        manifest = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest, encoding='utf-8') as f:
+                self.entries = json.load(f)
+    
+    def add(self, url, body, kind, content_type='text/html; charset=utf-8', status=200, etag=None):
+        """Store a response body under the given URL, replacing an earlier recording"""
+        key = normalize_url(url)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                extension = 'xml' if kind == 'feed' else 'html'
+                entry = {'file': f'{len(self.entries):06d}.{extension}'}
+                self.entries[key] = entry
+            entry.update(url=url, kind=kind, content_type=content_type, status=status, etag=etag)
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, entry['file']), 'wb') as f:
+            f.write(body)
+    
+    def get(self, url):
+        """Return (entry, body) recorded for the URL, or None"""
+        entry = self.entries.get(normalize_url(url))
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, entry['file']), 'rb') as f:
+            return entry, f.read()
+    
+    def iter_bodies(self, kind):
+        """Yield (url, body) of every recorded response of the given kind"""
+        for key, entry in self.entries.items():
+            if entry['kind'] == kind:
+                yield entry['url'], self.get(key)[1]
+    
+    def hosts(self):
+        """Return the (scheme, host) pairs of all recorded URLs"""
+        return {(urlparse(entry['url']).scheme, urlparse(entry['url']).netloc) for entry in self.entries.values()}
+    
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.path, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def _paragraphs(rng, count, keyword=None):
+    sentences = [rng.choice(FILLER_SENTENCES) for _ in range(count * 4)]
+    if keyword:
+        sentences[rng.randrange(len(sentences))] = f'이번 발표는 {keyword} 문제에 대한 관심을 다시 불러일으켰다.'
+    return [' '.join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+
+
+def _title(rng, keyword=None):
+    if keyword:
+        return rng.choice(RELEVANT_TITLE_TEMPLATES).format(keyword=keyword)
+    return rng.choice(UNRELATED_TITLES)
+
+
+def _article_html(rng, title, paragraphs):
+    """A news page with navigation, sidebar and scripts around the article body"""
+    nav = ''.join(f'<li><a href="/section/{i}">섹션 {i}</a></li>' for i in range(40))
+    related = ''.join(f'<li><a href="/article/related{rng.randrange(10 ** 6)}">{rng.choice(UNRELATED_TITLES)}</a></li>'
+                      for _ in range(15))
+    body = ''.join(f'<p>{escape(paragraph)}</p>' for paragraph in paragraphs)
+    return (
+        '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8">'
+        f'<title>{escape(title)}</title><script>window.dataLayer = [];</script>'
+        '<link rel="stylesheet" href="/static/site.css"></head><body>'
+        f'<header><nav><ul>{nav}</ul></nav></header>'
+        f'<main><article><h1>{escape(title)}</h1><div class="byline">기자 홍길동</div>{body}</article>'
+        f'<aside><h2>많이 본 뉴스</h2><ul>{related}</ul></aside></main>'
+        '<footer><p>Copyright. All rights reserved.</p></footer></body></html>'
+    ).encode('utf-8')
+
+
+def _article_path(site, n, day):
+    pattern = re.compile(site.get('article_url_pattern') or '.')
+    for template in ARTICLE_PATH_TEMPLATES:
+        path = template.format(n=n, day=day)
+        if pattern.search(path):
+            return path
+    return ARTICLE_PATH_TEMPLATES[-1].format(n=n, day=day)
+
+
+def generate_synthetic(scraper, path, feed_items=30, search_results=20, relevant_ratio=0.3,
+                       paragraphs=8, seed=0):
+    """Write a deterministic synthetic corpus for every source configured on the scraper
+    
+    Each RSS source gets a feed of `feed_items` entries and each news site one search
+    result page per search term; every linked article has its own HTML page. About
+    `relevant_ratio` of the entries mention one of the scraper's keywords.
+    """
+    rng = random.Random(seed)
+    corpus = Corpus(path)
+    published = datetime(2024, 5, 31, 12, 0)
+    n = 0
+    
+    def add_article(url, keyword):
+        title = _title(rng, keyword)
+        paragraph_list = _paragraphs(rng, paragraphs, keyword)
+        corpus.add(url, _article_html(rng, title, paragraph_list), 'article')
+        return title, paragraph_list[0]
+    
+    for index, source in enumerate(scraper.rss_sources):
+        parsed = urlparse(source['url'])
+        items = []
+        for _ in range(feed_items):
+            n += 1
+            keyword = rng.choice(scraper.keywords) if rng.random() < relevant_ratio else None
+            url = f'{parsed.scheme}://{parsed.netloc}/article/{n}'
+            title, summary = add_article(url, keyword)
+            published -= timedelta(minutes=rng.randrange(5, 90))
+            items.append(
+                f'<item><title>{escape(title)}</title><link>{url}</link>'
+                f'<description>{escape(summary)}</description>'
+                f'<pubDate>{format_datetime(published.replace(tzinfo=timezone.utc))}</pubDate></item>'
+            )
+        feed = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f'<title>{escape(source["name"])}</title><link>{parsed.scheme}://{parsed.netloc}/</link>'
+            f'{"".join(items)}</channel></rss>'
+        ).encode('utf-8')
+        corpus.add(source['url'], feed, 'feed', content_type='application/rss+xml; charset=utf-8',
+                   etag=f'"synthetic-{seed}-{index}"')
+    
+    for site in scraper.news_sites:
+        for term in scraper.search_terms:
+            results = []
+            for _ in range(search_results):
+                n += 1
+                keyword = rng.choice(scraper.keywords) if rng.random() < relevant_ratio else None
+                path = _article_path(site, n, rng.randrange(1, 29))
+                title, _ = add_article(site['base_url'] + path, keyword)
+                results.append(f'<li class="result"><a href="{escape(path)}">{escape(title)}</a></li>')
+            nav = ''.join(f'<li><a href="/section/{i}">섹션 {i}</a></li>' for i in range(60))
+            page = (
+                '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8"><title>검색</title></head><body>'
+                f'<header><nav><ul>{nav}</ul></nav></header>'
+                f'<div class="search_list"><ul>{"".join(results)}</ul></div>'
+                '<footer><a href="/about">회사소개</a></footer></body></html>'
+            ).encode('utf-8')
+            corpus.add(f"{site['search_url']}?q={quote_plus(term)}", page, 'search')
+    
+    corpus.save()
+    return corpus
+
+
+def synthetic_articles(start, count, seed=0):
+    """Return `count` article dicts for the store, numbered from `start`, spread over about two years"""
+    rng = random.Random(seed + start)
+    sources = [('연합뉴스', 'Politics'), ('한겨레', 'News'), ('경향신문', 'News'), ('중앙일보', 'News'),
+               ('KBS News', 'Broadcasting'), ('조선일보', 'News'), ('동아일보', 'News'), ('SBS News', 'Broadcasting')]
+    keywords = ['위안부', 'comfort women', '기지촌', '미군 위안부', 'wartime sexual slavery']
+    newest = datetime(2025, 1, 1)
+    articles = []
+    for n in range(start, start + count):
+        source, category = rng.choice(sources)
+        keyword = rng.choice(keywords)
+        paragraphs = _paragraphs(rng, 6, keyword)
+        articles.append({
+            'title': _title(rng, keyword),
+            'summary': paragraphs[0],
+            'content': '\n'.join(paragraphs),
+            'url': f'https://bench.example.com/article/{n}',
+            'source': source,
+            'published_date': newest - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+            'category': category
+        })
+    return articles
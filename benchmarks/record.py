@@ -0,0 +1,49 @@
+"""Record the live sources into a corpus directory: python -m benchmarks.record benchmarks/fixtures/live"""
+import argparse
+import logging
+from benchmarks.corpus import Corpus
+from news_scraper import NewsScraperService
+
+
+def record(path, host_delay=1.0):
+    """Crawl every configured source once and store each response the scraper downloads"""
+    corpus = Corpus(path)
+    scraper = NewsScraperService(host_delay=host_delay)
+    feed_urls = {source['url'] for source in scraper.rss_sources}
+    search_urls = tuple(site['search_url'] for site in scraper.news_sites)
+    fetch = scraper.fetch
+    
+    def recording_fetch(url, headers=None, source=''):
+        # Conditional headers are dropped so every feed is recorded in full
+        response = fetch(url, source=source)
+        if url in feed_urls:
+            kind = 'feed'
+        elif url.startswith(search_urls):
+            kind = 'search'
+        else:
+            kind = 'article'
+        corpus.add(url, response.content, kind,
+                   content_type=response.headers.get('Content-Type'),
+                   status=response.status_code,
+                   etag=response.headers.get('ETag'))
+        return response
+    
+    scraper.fetch = recording_fetch
+    articles = scraper.scrape_all_sources()
+    corpus.save()
+    return corpus, articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record RSS feeds, search pages and articles of the live sources')
+    parser.add_argument('corpus', help='directory to write the corpus to')
+    parser.add_argument('--host-delay', type=float, default=1.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    
+    corpus, articles = record(args.corpus, args.host_delay)
+    print(f'Recorded {len(corpus.entries)} responses ({len(articles)} relevant articles) in {args.corpus}')
+
+
+if __name__ == '__main__':
+    main()
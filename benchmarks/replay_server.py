@@ -0,0 +1,159 @@
+import argparse
+import gzip
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from benchmarks.corpus import Corpus
+
+
+class ReplayServer:
+    """Local HTTP server replaying a recorded Corpus with configurable latency
+    
+    A recorded URL such as https://www.yna.co.kr/rss/politics.xml is served at
+    <base_url>/https/www.yna.co.kr/rss/politics.xml. Absolute and root-relative
+    links inside the served pages are rewritten the same way, so a scraper
+    pointed at the server never leaves it.
+    """
+    
+    def __init__(self, corpus, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, seed=0):
+        self.corpus = corpus
+        # Seconds added to every response, plus a uniform random 0..jitter
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        
+        self._httpd = ThreadingHTTPServer((host, port), type('Handler', (_ReplayHandler,), {'replay': self}))
+        self._httpd.daemon_threads = True
+        self.base_url = f'http://{host}:{self._httpd.server_address[1]}'
+        hosts = sorted(netloc for _, netloc in corpus.hosts())
+        self._absolute_link = re.compile(
+            rb'(https?)://(' + b'|'.join(re.escape(netloc.encode()) for netloc in hosts) + rb')'
+        ) if hosts else None
+        self._thread = None
+    
+    def replay_url(self, url):
+        """Return the URL under which the server replays a recorded URL"""
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        query = f'?{parsed.query}' if parsed.query else ''
+        return f'{self.base_url}/{parsed.scheme}/{parsed.netloc}{path}{query}'
+    
+    def point_scraper_at(self, scraper):
+        """Rewrite the scraper's source URLs so every request goes to this server"""
+        for source in scraper.rss_sources:
+            source['url'] = self.replay_url(source['url'])
+        for site in scraper.news_sites:
+            site['base_url'] = self.replay_url(site['base_url']).rstrip('/')
+            site['search_url'] = self.replay_url(site['search_url'])
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+    
+    def serve_forever(self):
+        self._httpd.serve_forever()
+    
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    
+    def count_response(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+    
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+    
+    def delay(self):
+        with self._lock:
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0
+        return self.latency + extra
+    
+    def body(self, url, entry, raw, compressed):
+        """Return the served body of a recording, rewritten and optionally gzipped, memoized"""
+        key = (url, compressed)
+        body = self._bodies.get(key)
+        if body is None:
+            if self._absolute_link is not None:
+                raw = self._absolute_link.sub(lambda m: f'{self.base_url}/'.encode() + m.group(1) + b'/' + m.group(2), raw)
+            parsed = urlparse(entry['url'])
+            raw = re.sub(rb'(href|src)="/(?!/)', lambda m: m.group(1) + f'="/{parsed.scheme}/{parsed.netloc}/'.encode(), raw)
+            body = gzip.compress(raw) if compressed else raw
+            self._bodies[key] = body
+        return body
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    replay = None
+    
+    def do_GET(self):
+        server = self.replay
+        parts = self.path.lstrip('/').split('/', 2)
+        if len(parts) < 2 or parts[0] not in ('http', 'https'):
+            self.send_error(404)
+            return
+        url = f'{parts[0]}://{parts[1]}/' + (parts[2] if len(parts) > 2 else '')
+        recorded = server.corpus.get(url)
+        time.sleep(server.delay())
+        if recorded is None:
+            self.send_error(404)
+            return
+        entry, raw = recorded
+        
+        if entry.get('etag') and self.headers.get('If-None-Match') == entry['etag']:
+            self.send_response(304)
+            self.send_header('ETag', entry['etag'])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        compressed = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = server.body(url, entry, raw, compressed)
+        self.send_response(entry.get('status', 200))
+        self.send_header('Content-Type', entry.get('content_type') or 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        if entry.get('etag'):
+            self.send_header('ETag', entry['etag'])
+        self.end_headers()
+        self.wfile.write(body)
+        server.count_response(len(body))
+    
+    def log_message(self, format, *args):
+        logging.debug(f"Replay server: {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a recorded corpus locally')
+    parser.add_argument('corpus', help='corpus directory')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra latency, up to this many seconds')
+    args = parser.parse_args()
+    
+    server = ReplayServer(Corpus(args.corpus), port=args.port, latency=args.latency, jitter=args.jitter)
+    print(f'Replaying {len(server.corpus.entries)} responses at {server.base_url}')
+    for scheme, netloc in sorted(server.corpus.hosts()):
+        print(f'  {scheme}://{netloc} -> {server.base_url}/{scheme}/{netloc}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import json
+import statistics
+import sys
+import time
+
+
+def measure(func, repeat=5, warmup=1):
+    """Call func repeatedly and return timing statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'min_ms': samples[0],
+        'runs': len(samples)
+    }
+
+
+def add_output_arguments(parser):
+    parser.add_argument('--save', metavar='FILE', help='write the results as JSON, e.g. to use as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='baseline JSON to compare the results against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative slowdown of median_ms over the baseline reported as a regression')
+
+
+def print_results(results):
+    """Print one line per benchmark with its numeric results"""
+    width = max((len(name) for name in results), default=0)
+    for name, values in results.items():
+        fields = '  '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}'
+                           for key, value in values.items())
+        print(f'{name:<{width}}  {fields}')
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline_ms, current_ms) for benchmarks whose median got slower than allowed"""
+    regressions = []
+    for name, values in results.items():
+        before = baseline.get(name, {}).get('median_ms')
+        after = values.get('median_ms')
+        if before and after is not None and after > before * (1 + tolerance):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def finish(results, args):
+    """Print, save and compare the results as requested on the command line; returns the exit status"""
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No regressions against {args.compare} (tolerance {args.tolerance:.0%})')
+    return 0
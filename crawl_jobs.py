@@ -0,0 +1,268 @@
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app import db
+from models import CrawlRun
+from process_lock import ProcessLock
+
+# A queued or running crawl not updated for this long belongs to a process that exited
+STALE_RUN_SECONDS = 600
+
+
+def covers(source_names, requested):
+    """True if a crawl of source_names (None for all sources) includes every requested source"""
+    return source_names is None or (requested is not None and set(requested) <= set(source_names))
+
+
+class CrawlJob:
+    """State of one background crawl, including per-source progress"""
+    
+    def __init__(self, trigger, job_id=None, source_names=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.trigger = trigger
+        # Names of the sources to crawl, or None for all of them
+        self.source_names = source_names
+        self.status = 'running'
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.sources = OrderedDict()
+        self.added_count = None
+        self.total_articles = None
+        self.error = None
+        self._lock = threading.Lock()
+    
+    def update_source(self, name, state, article_count=None):
+        """Progress callback passed to the scraper"""
+        with self._lock:
+            progress = self.sources.setdefault(name, {'state': 'pending', 'articles': 0})
+            progress['state'] = state
+            if article_count is not None:
+                progress['articles'] = article_count
+    
+    def to_dict(self):
+        with self._lock:
+            sources = {name: dict(progress) for name, progress in self.sources.items()}
+        return {
+            'job_id': self.id,
+            'trigger': self.trigger,
+            'source_names': self.source_names,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'sources': sources,
+            'sources_done': sum(1 for progress in sources.values() if progress['state'] == 'done'),
+            'sources_total': len(sources),
+            'added_count': self.added_count,
+            'total_articles': self.total_articles,
+            'error': self.error
+        }
+
+
+class CrawlRunStore:
+    """Crawl jobs kept in the database, so any worker process can request a crawl and report its progress"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    def _expire_stale(self):
+        stale_before = datetime.now() - timedelta(seconds=STALE_RUN_SECONDS)
+        CrawlRun.query.filter(CrawlRun.status.in_(('queued', 'running')),
+                              CrawlRun.updated_at < stale_before).update(
+            {CrawlRun.status: 'failed'}, synchronize_session=False)
+    
+    def request(self, trigger):
+        """Queue a crawl of all sources for the crawling process, or return the one queued or running; returns (run, created)
+        
+        A running crawl of only some sources is not joined; the new request is
+        queued and runs after it.
+        """
+        with self.app.app_context():
+            # Check and insert under a lock shared by all workers, so simultaneous requests queue a single run
+            with ProcessLock(db.engine, 'crawl_request', self.app.instance_path):
+                self._expire_stale()
+                runs = CrawlRun.query.filter(CrawlRun.status.in_(('queued', 'running'))).order_by(CrawlRun.requested_at)
+                run = next((run for run in runs if run.status == 'queued' or run.to_dict().get('source_names') is None),
+                           None)
+                created = run is None
+                if created:
+                    run = CrawlRun(id=uuid.uuid4().hex, trigger=trigger, status='queued')
+                    db.session.add(run)
+                db.session.commit()
+            db.session.refresh(run)
+            db.session.expunge(run)
+            return run, created
+    
+    def next_queued(self):
+        """Return (job_id, trigger) of the oldest queued request, or None"""
+        with self.app.app_context():
+            run = CrawlRun.query.filter_by(status='queued').order_by(CrawlRun.requested_at).first()
+            return (run.id, run.trigger) if run else None
+    
+    def save(self, job):
+        """Write the job's current state"""
+        with self.app.app_context():
+            try:
+                run = db.session.get(CrawlRun, job.id)
+                if run is None:
+                    run = CrawlRun(id=job.id, trigger=job.trigger, requested_at=job.started_at)
+                    db.session.add(run)
+                run.status = job.status
+                run.updated_at = datetime.now()
+                run.snapshot = json.dumps(job.to_dict(), ensure_ascii=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error saving crawl job {job.id}: {e}")
+    
+    def prune(self, keep):
+        """Delete finished runs older than the newest `keep` of them"""
+        with self.app.app_context():
+            try:
+                finished = CrawlRun.query.filter(CrawlRun.status.in_(('completed', 'failed')))
+                oldest_kept = finished.order_by(CrawlRun.requested_at.desc()).offset(keep - 1).first()
+                if oldest_kept is None:
+                    return
+                finished.filter(CrawlRun.requested_at < oldest_kept.requested_at).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error pruning crawl runs: {e}")
+    
+    def load(self, job_id):
+        """Return the stored run with the given id, or None"""
+        with self.app.app_context():
+            run = db.session.get(CrawlRun, job_id)
+            if run is not None:
+                db.session.expunge(run)
+            return run
+
+
+class CrawlJobManager:
+    """Runs crawls in a background thread, joining new requests onto a crawl already in progress
+    
+    A request for sources the running crawl does not cover is queued instead,
+    merged with any other queued request, and started when the crawl finishes.
+    With a CrawlRunStore the jobs are shared between worker processes: only the
+    process with `runs_crawls` set crawls, and the others queue requests in the
+    store for it to pick up in process_requests().
+    """
+    
+    def __init__(self, run_func, history_size=20, store=None):
+        # run_func(job) performs the crawl and returns (added_count, total_articles)
+        self.run_func = run_func
+        self.history_size = history_size
+        self.store = store
+        self.runs_crawls = True
+        self.current = None
+        # Job queued to run after the current one
+        self.pending = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, trigger='manual', source_names=None):
+        """Start a crawl of the named sources (all by default); returns (job, started)
+        
+        If a crawl is running, returns it when it covers the sources, and
+        otherwise the job queued to run after it.
+        """
+        if self.store and not self.runs_crawls:
+            return self.store.request(trigger)
+        
+        with self._lock:
+            if self.current is not None:
+                if covers(self.current.source_names, source_names):
+                    return self.current, False
+                job = self._queue(trigger, source_names)
+                started = False
+            else:
+                job = self._take_queued() or CrawlJob(trigger, source_names=source_names)
+                self.current = job
+                self._remember(job)
+                started = True
+        
+        if started:
+            self._start(job)
+        elif self.store:
+            self.store.save(job)
+        return job, started
+    
+    def _take_queued(self):
+        """Take over a request queued by another process, keeping its id for its pollers"""
+        queued = self.store.next_queued() if self.store else None
+        return CrawlJob(queued[1], job_id=queued[0]) if queued else None
+    
+    def _queue(self, trigger, source_names):
+        """Queue a crawl of the sources after the current one, merging it into the job already queued"""
+        job = self.pending
+        if job is None:
+            job = self._take_queued() or CrawlJob(trigger, source_names=source_names)
+            job.status = 'queued'
+            self.pending = job
+            self._remember(job)
+        if not covers(job.source_names, source_names):
+            job.source_names = None if source_names is None else sorted(set(job.source_names) | set(source_names))
+        return job
+    
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history_size:
+            self._jobs.popitem(last=False)
+    
+    def _start(self, job):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        if self.store:
+            self.store.save(job)
+        threading.Thread(target=self._run, args=(job,), name=f'crawl-{job.id[:8]}', daemon=True).start()
+    
+    def get(self, job_id):
+        """Return the job with the given id, or None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            return self.store.load(job_id)
+        return job
+    
+    def process_requests(self):
+        """Save the running and queued jobs for other processes, or start a crawl they requested
+        
+        A request queued by another process while a crawl runs is adopted as
+        the queued job, and saving it keeps its row from expiring as stale.
+        """
+        if not self.store or not self.runs_crawls:
+            return
+        with self._lock:
+            job = self.current
+            queued = self.store.next_queued() if job is not None and self.pending is None else None
+            if queued:
+                self._queue(queued[1], None)
+            pending = self.pending
+        if job is None:
+            if self.store.next_queued():
+                self.submit()
+            return
+        self.store.save(job)
+        if pending is not None:
+            self.store.save(pending)
+    
+    def _run(self, job):
+        try:
+            job.added_count, job.total_articles = self.run_func(job)
+            job.status = 'completed'
+        except Exception as e:
+            logging.error(f"Crawl job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                queued = self.pending
+                self.current, self.pending = queued, None
+            if self.store:
+                self.store.save(job)
+                self.store.prune(self.history_size)
+            if queued is not None:
+                self._start(queued)
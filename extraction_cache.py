@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class ExtractionCache:
+    """Disk-backed cache of extracted article text, keyed by article URL"""
+    
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=64 * 1024 * 1024, prune_every=50):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._writes_since_prune = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                url TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_extraction_cache_fetched_at ON extraction_cache (fetched_at)"
+        )
+        self._conn.commit()
+    
+    def get(self, url):
+        """Return cached content for the URL, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, fetched_at FROM extraction_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content, fetched_at = row
+        if time.time() - fetched_at > self.ttl_seconds:
+            return None
+        return content
+    
+    def put(self, url, content):
+        """Store extracted content for the URL"""
+        if not content:
+            return
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (url, content, content_hash, fetched_at, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, content, content_hash, time.time(), size)
+            )
+            self._conn.commit()
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self.prune_every:
+                self._prune_locked()
+    
+    def prune(self):
+        """Drop expired entries and evict the oldest ones above the size limit"""
+        with self._lock:
+            self._prune_locked()
+    
+    def _prune_locked(self):
+        self._writes_since_prune = 0
+        try:
+            self._conn.execute(
+                "DELETE FROM extraction_cache WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk entries oldest first and cut where the remainder fits the budget
+                excess = total - self.max_bytes
+                cutoff = None
+                for fetched_at, size in self._conn.execute(
+                        "SELECT fetched_at, size FROM extraction_cache ORDER BY fetched_at"):
+                    excess -= size
+                    cutoff = fetched_at
+                    if excess <= 0:
+                        break
+                self._conn.execute("DELETE FROM extraction_cache WHERE fetched_at <= ?", (cutoff,))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error pruning extraction cache: {e}")
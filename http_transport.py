@@ -0,0 +1,38 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def create_session(user_agent=DEFAULT_USER_AGENT, pool_maxsize=8, pool_hosts=32,
+                   retries=3, backoff_factor=0.5):
+    """Create the pooled HTTP session used for every feed, search page and article download
+    
+    Connections are kept alive in one pool per host, transient failures
+    (connection errors, 429 and 5xx answers) are retried with exponential
+    backoff, and responses are requested compressed: gzip, deflate and brotli
+    (the brotli package is a dependency), plus zstd when urllib3 can decode it.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': user_agent,
+        'Accept-Encoding': ACCEPT_ENCODING
+    })
+    return session
@@ -0,0 +1,58 @@
+import re
+
+
+class KeywordMatcher:
+    """Precompiled multi-keyword matcher that scans text once for all keywords
+    
+    The keywords are merged into a trie and compiled into a single regular
+    expression, so the regex engine walks shared prefixes once per position
+    instead of testing every keyword separately.
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[None] = keyword
+        self._pattern = re.compile(self._trie_to_regex(trie)) if self.keywords else None
+        
+        # A match reports the longest keyword at its position; shorter keywords
+        # contained in it are implied and added from this table
+        self._contained = {
+            keyword: {other for other in self.keywords if other in keyword}
+            for keyword in self.keywords
+        }
+    
+    def _trie_to_regex(self, node):
+        branches = [re.escape(char) + self._trie_to_regex(child)
+                    for char, child in sorted(node.items(), key=lambda item: item[0] or '')
+                    if char is not None]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if None in node:
+            # Greedy optional group so longer keywords win over their prefixes
+            return '(?:' + pattern + ')?'
+        return pattern
+    
+    def search(self, text):
+        """Return True if any keyword occurs in the text"""
+        if not text or self._pattern is None:
+            return False
+        return self._pattern.search(text.lower()) is not None
+    
+    def find_all(self, text):
+        """Return the set of keywords occurring in the text, including overlapping ones"""
+        found = set()
+        if not text or self._pattern is None:
+            return found
+        text = text.lower()
+        match = self._pattern.search(text)
+        while match:
+            found |= self._contained[match.group()]
+            match = self._pattern.search(text, match.start() + 1)
+        return found
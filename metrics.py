@@ -0,0 +1,165 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast page renders to slow article downloads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named metric with fixed label names; one child value per label combination"""
+    type = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+    
+    def _render_samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type = 'gauge'
+    
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with their sum and count"""
+    type = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, the +Inf bucket last, then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with-block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Crawl metrics, labelled by source name; stage is one of fetch, parse, filter, extract
+SCRAPER_STAGE_SECONDS = REGISTRY.register(Histogram(
+    'scraper_stage_seconds', 'Time spent per crawl stage and source', ('source', 'stage')))
+SCRAPER_BYTES = REGISTRY.register(Counter(
+    'scraper_downloaded_bytes_total', 'Decoded response bytes downloaded per source', ('source',)))
+SCRAPER_CANDIDATES = REGISTRY.register(Counter(
+    'scraper_candidates_total', 'Feed entries and search result links checked for relevance', ('source',)))
+SCRAPER_RELEVANT = REGISTRY.register(Counter(
+    'scraper_relevant_total', 'Candidates that passed the relevance filter', ('source',)))
+SCRAPER_DUPLICATES = REGISTRY.register(Counter(
+    'scraper_near_duplicates_total', 'Relevant feed entries skipped as near duplicates of another article', ('source',)))
+SCRAPER_KNOWN_SKIPPED = REGISTRY.register(Counter(
+    'scraper_known_urls_skipped_total', 'Relevant articles not downloaded because their URL is already stored', ('source',)))
+SCRAPER_ERRORS = REGISTRY.register(Counter(
+    'scraper_errors_total', 'Failed crawl steps per source and stage', ('source', 'stage')))
+EXTRACTION_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'scraper_extraction_cache_lookups_total', 'Extraction cache lookups by result', ('result',)))
+
+SOURCE_POLL_INTERVAL = REGISTRY.register(Gauge(
+    'scraper_source_poll_interval_seconds', 'Current adaptive polling interval per source', ('source',)))
+
+# Crawl job and store metrics
+CRAWL_SECONDS = REGISTRY.register(Histogram(
+    'crawl_duration_seconds', 'Duration of complete crawls', ('status',), buckets=(10, 30, 60, 120, 300, 600, 1200, 1800)))
+ARTICLES_ADDED = REGISTRY.register(Counter(
+    'articles_added_total', 'New articles stored by crawls'))
+ARTICLES_STORED = REGISTRY.register(Gauge(
+    'articles_stored', 'Articles in the store after the last crawl'))
+
+# Web metrics, labelled by URL rule rather than raw path to keep the label set small
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Request latency per route', ('route', 'method', 'status')))
+PAGE_CACHE_REQUESTS = REGISTRY.register(Counter(
+    'page_cache_requests_total', 'Cacheable page requests by result (hit, miss, not_modified)', ('result',)))
@@ -1,21 +1,76 @@
 from app import db
 from datetime import datetime
+import json
+import sys
+import zlib
+import article_tags
+
+# zlib level for stored article bodies; higher levels gain little on news text
+CONTENT_COMPRESSION_LEVEL = 6
 
 class Article(db.Model):
-    """Article model for storing news articles in database if needed in future"""
+    """Article model for storing scraped news articles"""
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     summary = db.Column(db.Text)
-    content = db.Column(db.Text)
+    # Full text is kept either plain or zlib-compressed; use the `content` property
+    content_text = db.Column('content', db.Text)
+    content_compressed = db.Column(db.LargeBinary)
     url = db.Column(db.String(1000), unique=True, nullable=False)
-    source = db.Column(db.String(200), nullable=False)
+    source = db.Column(db.String(200), nullable=False, index=True)
     published_date = db.Column(db.DateTime, nullable=False)
     scraped_date = db.Column(db.DateTime, default=datetime.utcnow)
-    category = db.Column(db.String(100))
+    category = db.Column(db.String(100), index=True)
+    # SimHash of title and summary (signed 64-bit), used to spot syndicated copies
+    simhash = db.Column(db.BigInteger)
+    # JSON list of {"source", "url"} of near-duplicate copies merged into this article
+    also_published = db.Column(db.Text)
+    # JSON {kind: [tags]} of organizations, events and locations extracted at ingest; NULL until extracted
+    tags = db.Column(db.Text)
+    
+    # Newest-first listings and keyset pagination seek on (published_date, id)
+    __table_args__ = (db.Index('ix_article_published_date_id', 'published_date', 'id'),)
     
     def __repr__(self):
         return f'<Article {self.title[:50]}...>'
     
+    @staticmethod
+    def decode_content(content_text, content_compressed):
+        """Return the article text stored in the two content columns"""
+        if content_compressed is not None:
+            return zlib.decompress(content_compressed).decode('utf-8')
+        return content_text
+    
+    @property
+    def content(self):
+        """Full article text, decompressed on access"""
+        return self.decode_content(self.content_text, self.content_compressed)
+    
+    @content.setter
+    def content(self, value):
+        # Compressed on SQLite only: PostgreSQL already compresses large values
+        # itself (TOAST), and its ILIKE keyword search needs the plain column
+        if value and db.engine.dialect.name == 'sqlite':
+            self.content_compressed = zlib.compress(value.encode('utf-8'), CONTENT_COMPRESSION_LEVEL)
+            self.content_text = None
+        else:
+            self.content_text = value
+            self.content_compressed = None
+    
+    @property
+    def other_sources(self):
+        """Sources and URLs of the merged near-duplicate copies"""
+        return json.loads(self.also_published) if self.also_published else []
+    
+    def add_also_published(self, source, url):
+        """Record a near-duplicate copy of this article; returns False if it was already known"""
+        copies = self.other_sources
+        if url == self.url or any(copy['url'] == url for copy in copies):
+            return False
+        copies.append({'source': source, 'url': url})
+        self.also_published = json.dumps(copies, ensure_ascii=False)
+        return True
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -26,5 +81,101 @@ class Article(db.Model):
             'source': self.source,
             'published_date': self.published_date.isoformat() if self.published_date else None,
             'scraped_date': self.scraped_date.isoformat() if self.scraped_date else None,
-            'category': self.category
+            'category': self.category,
+            'also_published': self.other_sources,
+            'tags': article_tags.decode_tags(self.tags)
+        }
+
+class ArticleRecord:
+    """Compact read-only article metadata for listings; the body is only loaded on request"""
+    __slots__ = ('id', 'title', 'summary', 'url', 'source', 'published_date', 'category', 'tags', 'content')
+    
+    # Columns selected for a listing, in __init__ argument order
+    columns = (Article.id, Article.title, Article.summary, Article.url, Article.source,
+               Article.published_date, Article.category, Article.tags)
+    
+    def __init__(self, id, title, summary, url, source, published_date, category, tags=None, content=None):
+        self.id = id
+        self.title = title
+        self.summary = summary
+        self.url = url
+        # Sources and categories repeat across the corpus; share one string per value
+        self.source = sys.intern(source) if source else source
+        self.published_date = published_date
+        self.category = sys.intern(category) if category else category
+        self.tags = article_tags.decode_tags(tags)
+        self.content = content
+    
+    def __repr__(self):
+        return f'<ArticleRecord {self.title[:50]}...>'
+    
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'title': self.title,
+            'summary': self.summary,
+            'url': self.url,
+            'source': self.source,
+            'published_date': self.published_date.isoformat() if self.published_date else None,
+            'category': self.category,
+            'tags': self.tags
+        }
+        if self.content is not None:
+            data['content'] = self.content
+        return data
+
+class FacetCount(db.Model):
+    """Running article counts per facet value (category, source, publication day), maintained at ingest"""
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<FacetCount {self.facet}={self.value}: {self.count}>'
+
+class StoreState(db.Model):
+    """Single row of store-wide state shared by all worker processes"""
+    id = db.Column(db.Integer, primary_key=True)
+    # Incremented with every change to the stored articles; cached pages are keyed by it
+    version = db.Column(db.Integer, nullable=False, default=0)
+    last_update = db.Column(db.DateTime)
+    summary = db.Column(db.Text)
+    summary_fingerprint = db.Column(db.String(40))
+    
+    def __repr__(self):
+        return f'<StoreState version {self.version}>'
+
+class CrawlRun(db.Model):
+    """A crawl requested or run by any worker process; its progress snapshot is written by the crawling process"""
+    id = db.Column(db.String(32), primary_key=True)
+    trigger = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, index=True)
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    # JSON of CrawlJob.to_dict(), absent while the run is queued
+    snapshot = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<CrawlRun {self.id} {self.status}>'
+    
+    def to_dict(self):
+        error = 'The crawl stopped reporting progress' if self.status == 'failed' else None
+        if self.snapshot:
+            # The row status wins, as stale runs are marked failed without a new snapshot
+            data = dict(json.loads(self.snapshot), status=self.status)
+            data['error'] = data.get('error') or error
+            return data
+        return {
+            'job_id': self.id,
+            'trigger': self.trigger,
+            'source_names': None,
+            'status': self.status,
+            'started_at': None,
+            'finished_at': None,
+            'sources': {},
+            'sources_done': 0,
+            'sources_total': 0,
+            'added_count': None,
+            'total_articles': None,
+            'error': error
         }
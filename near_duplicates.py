@@ -0,0 +1,115 @@
+import hashlib
+import re
+import threading
+
+# Words are runs of letters and digits; Hangul syllables count as letters
+WORD_RE = re.compile(r'[^\W_]+')
+
+FINGERPRINT_BITS = 64
+
+# Maximum number of differing bits for two fingerprints to be likely the same story;
+# prefixes like [속보] or a shortened summary typically flip 3 to 7 bits
+MAX_DISTANCE = 7
+
+# Share of title words (of the shorter title) two likely duplicates must have in common
+MIN_TITLE_OVERLAP = 0.5
+
+# Texts shorter than this (after normalization) are too short to fingerprint reliably
+MIN_TEXT_LENGTH = 20
+
+SHINGLE_SIZE = 3
+
+
+def fingerprint(title, summary=None):
+    """Return the 64-bit SimHash of an article's title and summary, or None if the text is too short
+    
+    The text is lowercased and reduced to its words, then hashed as overlapping
+    character trigrams, which works for Korean without a tokenizer and is robust
+    to the small edits outlets make to syndicated wire stories.
+    """
+    text = ' '.join(WORD_RE.findall(f'{title or ""} {summary or ""}'.lower()))
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+    
+    hashes = [
+        int.from_bytes(hashlib.blake2b(text[i:i + SHINGLE_SIZE].encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    ]
+    half = len(hashes) / 2
+    value = 0
+    for bit in range(FINGERPRINT_BITS):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            value |= 1 << bit
+    return value
+
+
+def title_words(title):
+    return frozenset(WORD_RE.findall((title or '').lower()))
+
+
+def title_overlap(a, b):
+    """Overlap coefficient of two title word sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value):
+    """Map an unsigned 64-bit fingerprint onto a signed BIGINT column value"""
+    return value - (1 << FINGERPRINT_BITS) if value >= 1 << (FINGERPRINT_BITS - 1) else value
+
+
+def from_signed(value):
+    return value & ((1 << FINGERPRINT_BITS) - 1)
+
+
+class SimHashIndex:
+    """Thread-safe index of article fingerprints for finding near duplicates
+    
+    Fingerprints are split into MAX_DISTANCE + 1 bands; two fingerprints within
+    MAX_DISTANCE bits of each other agree on at least one whole band, so only
+    entries sharing a band are compared. A likely duplicate is confirmed when
+    the titles also share enough words.
+    """
+    
+    def __init__(self, max_distance=MAX_DISTANCE, min_title_overlap=MIN_TITLE_OVERLAP):
+        self.max_distance = max_distance
+        self.min_title_overlap = min_title_overlap
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._tables = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+    
+    def _band_keys(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (band * self.band_bits)) & mask for band in range(self.bands)]
+    
+    def _find(self, value, words):
+        for table, key in zip(self._tables, self._band_keys(value)):
+            for other, url, other_words in table.get(key, ()):
+                if (distance(value, other) <= self.max_distance
+                        and title_overlap(words, other_words) >= self.min_title_overlap):
+                    return url
+        return None
+    
+    def _insert(self, value, url, words):
+        for table, key in zip(self._tables, self._band_keys(value)):
+            table.setdefault(key, []).append((value, url, words))
+    
+    def add(self, value, url, title):
+        with self._lock:
+            self._insert(value, url, title_words(title))
+    
+    def claim(self, value, url, title):
+        """Return the URL of a confirmed near duplicate already indexed, or index this URL and return None"""
+        words = title_words(title)
+        with self._lock:
+            existing = self._find(value, words)
+            if existing is None:
+                self._insert(value, url, words)
+            return existing
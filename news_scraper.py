@@ -1,5 +1,4 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import feedparser
 import trafilatura
 import time
@@ -7,15 +6,58 @@ import logging
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 import re
+import threading
+import queue
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from keyword_matcher import KeywordMatcher
+from http_transport import create_session
+import metrics
+import near_duplicates
+
+
+class HostRateLimiter:
+    """Thread-safe limiter enforcing a minimum interval between requests to the same host"""
+    
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url):
+        """Block until the host of the given URL may be requested again"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
 
 class NewsScraperService:
     """Service for scraping news articles about Japanese military comfort women issues"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, max_workers=8, host_delay=1.0, extraction_cache=None,
+                 timeout=(5, 15), retries=3, backoff_factor=0.5, seen_urls=None):
+        # Number of sources fetched in parallel; 1 falls back to a serial crawl
+        self.max_workers = max(1, max_workers)
+        # Minimum seconds between two requests to the same host
+        self.rate_limiter = HostRateLimiter(host_delay)
+        # Optional ExtractionCache so known URLs are not downloaded again
+        self.extraction_cache = extraction_cache
+        # Optional membership test of URLs already stored (e.g. a SeenUrlFilter); those are not downloaded
+        self.seen_urls = seen_urls
+        # Failed crawl steps per source since startup, read by the adaptive poller
+        self.error_counts = Counter()
+        self._error_lock = threading.Lock()
+        
+        # One pooled, compressed, retrying session for feeds, search pages and articles
+        self.timeout = timeout
+        self.session = create_session(pool_maxsize=self.max_workers, retries=retries,
+                                      backoff_factor=backoff_factor)
         
         # Keywords for filtering relevant articles (both Japanese and US military)
         self.keywords = [
@@ -31,6 +73,7 @@ class NewsScraperService:
             '양공주', '양갈보', 'monkey house', 'vd clinic',
             '기지촌 성매매', '미군기지 주변', 'us base prostitution'
         ]
+        self.keyword_matcher = KeywordMatcher(self.keywords)
         
         # RSS feeds and news sources (Korean sources)
         self.rss_sources = [
@@ -62,190 +105,417 @@ class NewsScraperService:
         ]
         
         # News websites to scrape (Korean sites)
+        # Optional link extraction settings per site:
+        #   'article_url_pattern': regex an article link's href must match
+        #   'result_container': SoupStrainer arguments limiting parsing to the result list,
+        #                       e.g. {'name': 'div', 'class_': 'search_list'}
+        #   'result_selector': CSS selector for result links inside the container
         self.news_sites = [
             {
                 'name': '조선일보',
                 'base_url': 'https://www.chosun.com',
                 'search_url': 'https://www.chosun.com/nsearch/',
-                'category': 'News'
+                'category': 'News',
+                'article_url_pattern': r'/20\d{2}/\d{2}/\d{2}/'
             },
             {
                 'name': '동아일보',
                 'base_url': 'https://www.donga.com',
                 'search_url': 'https://www.donga.com/news/search',
-                'category': 'News'
+                'category': 'News',
+                'article_url_pattern': r'/news/[^/]+/article/'
             },
             {
                 'name': 'SBS News',
                 'base_url': 'https://news.sbs.co.kr',
                 'search_url': 'https://news.sbs.co.kr/news/search/main.do',
-                'category': 'Broadcasting'
+                'category': 'Broadcasting',
+                'article_url_pattern': r'endPage\.do\?news_id='
             }
         ]
+        
+        # Search for comfort women related articles (Japanese and US military)
+        self.search_terms = [
+            'comfort women', '위안부', 'wartime sexual slavery',
+            '미군 위안부', '기지촌', 'camp town', '기지촌 여성'
+        ]
     
     def is_relevant_article(self, title, content=None):
         """Check if article is relevant to comfort women issues"""
-        text_to_check = (title + ' ' + (content or '')).lower()
-        return any(keyword.lower() in text_to_check for keyword in self.keywords)
+        return self.keyword_matcher.search(title) or self.keyword_matcher.search(content)
+    
+    def matched_keywords(self, title, content=None):
+        """Return the set of keywords found in the article title and content"""
+        return self.keyword_matcher.find_all(title) | self.keyword_matcher.find_all(content)
+    
+    def fetch(self, url, headers=None, source=''):
+        """Download a URL through the shared session, respecting the per-host rate limit
+        
+        The download (not the rate limit wait) is recorded under the given source name.
+        """
+        self.rate_limiter.wait(url)
+        with metrics.SCRAPER_STAGE_SECONDS.time(source=source, stage='fetch'):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        metrics.SCRAPER_BYTES.inc(len(response.content), source=source)
+        return response
+    
+    def is_known_url(self, url, source=''):
+        """Return True if the URL is already stored according to the seen-URL filter"""
+        if self.seen_urls is None:
+            return False
+        try:
+            known = url in self.seen_urls
+        except Exception as e:
+            logging.error(f"Error checking seen URLs for {url}: {e}")
+            return False
+        if known:
+            metrics.SCRAPER_KNOWN_SKIPPED.inc(source=source)
+        return known
+    
+    def record_error(self, source, stage):
+        """Count a failed crawl step of a source"""
+        metrics.SCRAPER_ERRORS.inc(source=source, stage=stage)
+        with self._error_lock:
+            self.error_counts[source] += 1
     
-    def extract_article_content(self, url):
+    def extract_article_content(self, url, source=''):
         """Extract full article content using trafilatura"""
+        if self.extraction_cache:
+            cached = self.extraction_cache.get(url)
+            metrics.EXTRACTION_CACHE_LOOKUPS.inc(result='hit' if cached else 'miss')
+            if cached:
+                return cached
+        
+        stage = 'fetch'
         try:
-            downloaded = trafilatura.fetch_url(url)
-            if downloaded:
-                content = trafilatura.extract(downloaded)
+            response = self.fetch(url, source=source)
+            response.raise_for_status()
+            if response.content:
+                stage = 'extract'
+                # Pass raw bytes so trafilatura detects the page encoding itself
+                with metrics.SCRAPER_STAGE_SECONDS.time(source=source, stage='extract'):
+                    content = trafilatura.extract(response.content)
+                if content and self.extraction_cache:
+                    self.extraction_cache.put(url, content)
                 return content
         except Exception as e:
+            self.record_error(source, stage)
             logging.error(f"Error extracting content from {url}: {e}")
         return None
     
+    def iter_rss_source(self, source, duplicate_index=None):
+        """Yield relevant articles from a single RSS feed as they are extracted
+        
+        With a SimHashIndex, entries that are near duplicates of an article already
+        claimed by this crawl (or stored recently) are not downloaded; a merge record
+        {'url', 'source', 'title', 'duplicate_of'} is yielded for them instead.
+        """
+        try:
+            logging.info(f"Scraping RSS feed: {source['name']}")
+            # Send the validators from the previous poll so unchanged feeds answer 304
+            headers = {}
+            if source.get('etag'):
+                headers['If-None-Match'] = source['etag']
+            if source.get('modified'):
+                headers['If-Modified-Since'] = source['modified']
+            response = self.fetch(source['url'], headers=headers, source=source['name'])
+            
+            if response.status_code == 304:
+                logging.info(f"RSS feed not modified since last poll: {source['name']}")
+                return
+            response.raise_for_status()
+            
+            with metrics.SCRAPER_STAGE_SECONDS.time(source=source['name'], stage='parse'):
+                feed = feedparser.parse(response.content,
+                                        response_headers={'content-location': response.url,
+                                                          'content-type': response.headers.get('Content-Type', '')})
+            
+            for entry in feed.entries[:10]:  # Limit to 10 recent articles
+                title = entry.get('title', '')
+                summary = entry.get('summary', '')
+                
+                with metrics.SCRAPER_STAGE_SECONDS.time(source=source['name'], stage='filter'):
+                    relevant = self.is_relevant_article(title, summary)
+                metrics.SCRAPER_CANDIDATES.inc(source=source['name'])
+                if relevant:
+                    metrics.SCRAPER_RELEVANT.inc(source=source['name'])
+                    
+                    # Check for a syndicated copy before downloading the article
+                    fingerprint = near_duplicates.fingerprint(title, summary)
+                    if duplicate_index is not None and fingerprint is not None:
+                        canonical_url = duplicate_index.claim(fingerprint, entry.link, title)
+                        if canonical_url is not None and canonical_url != entry.link:
+                            metrics.SCRAPER_DUPLICATES.inc(source=source['name'])
+                            logging.info(f"Near duplicate of {canonical_url}: {title[:50]}...")
+                            yield {
+                                'title': title,
+                                'url': entry.link,
+                                'source': source['name'],
+                                'duplicate_of': canonical_url
+                            }
+                            continue
+                    
+                    # Stored articles are not downloaded again
+                    if self.is_known_url(entry.link, source=source['name']):
+                        continue
+                    
+                    # Extract publication date
+                    pub_date = None
+                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                        pub_date = datetime(*entry.published_parsed[:6])
+                    else:
+                        pub_date = datetime.now()
+                    
+                    # Extract full content
+                    content = self.extract_article_content(entry.link, source=source['name'])
+                    
+                    article = {
+                        'title': title,
+                        'summary': summary,
+                        'content': content or summary,
+                        'url': entry.link,
+                        'source': source['name'],
+                        'published_date': pub_date,
+                        'category': source['category'],
+                        'simhash': fingerprint
+                    }
+                    logging.info(f"Found relevant article: {title[:50]}...")
+                    yield article
+            
+            # Remember validators only once the entries were processed, so a failed
+            # run is retried in full on the next poll
+            source['etag'] = response.headers.get('ETag', source.get('etag'))
+            source['modified'] = response.headers.get('Last-Modified', source.get('modified'))
+            
+        except Exception as e:
+            self.record_error(source['name'], 'feed')
+            logging.error(f"Error scraping RSS feed {source['name']}: {e}")
+    
+    def scrape_rss_source(self, source):
+        """Scrape relevant articles from a single RSS feed"""
+        return list(self.iter_rss_source(source))
+    
     def scrape_rss_feeds(self):
         """Scrape articles from RSS feeds"""
         articles = []
-        
         for source in self.rss_sources:
+            articles.extend(self.scrape_rss_source(source))
+        return articles
+    
+    def extract_result_links(self, site, html, seen_urls):
+        """Return (url, text) pairs of new, relevant article links on a search result page
+        
+        Only the configured result container, or only article links when no container
+        is configured, is built into a tree, using the lxml parser.
+        """
+        url_pattern = re.compile(site['article_url_pattern']) if site.get('article_url_pattern') else None
+        if site.get('result_container'):
+            strainer = SoupStrainer(**site['result_container'])
+        else:
+            strainer = SoupStrainer('a', href=url_pattern or True)
+        soup = BeautifulSoup(html, 'lxml', parse_only=strainer)
+        
+        article_links = []
+        page_urls = set()
+        for link in soup.select(site.get('result_selector', 'a[href]')):
             try:
-                logging.info(f"Scraping RSS feed: {source['name']}")
-                # Set timeout for RSS feeds
-                feed = feedparser.parse(source['url'])
-                
-                for entry in feed.entries[:10]:  # Limit to 10 recent articles
-                    title = entry.get('title', '')
-                    summary = entry.get('summary', '')
-                    
-                    if self.is_relevant_article(title, summary):
-                        # Extract publication date
-                        pub_date = None
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            pub_date = datetime(*entry.published_parsed[:6])
-                        else:
-                            pub_date = datetime.now()
-                        
-                        # Extract full content
-                        content = self.extract_article_content(entry.link)
-                        
-                        article = {
-                            'title': title,
-                            'summary': summary,
-                            'content': content or summary,
-                            'url': entry.link,
-                            'source': source['name'],
-                            'published_date': pub_date,
-                            'category': source['category']
-                        }
-                        articles.append(article)
-                        logging.info(f"Found relevant article: {title[:50]}...")
-                
-                # Rate limiting
-                time.sleep(2)
-                
+                href = link.get('href')
+                if not href or (url_pattern and not url_pattern.search(href)):
+                    continue
+                full_url = urljoin(site['base_url'], str(href))
+                if full_url in seen_urls or full_url in page_urls:
+                    continue
+                text = link.get_text(strip=True)
+                if not text:
+                    continue
+                metrics.SCRAPER_CANDIDATES.inc(source=site['name'])
+                if self.is_relevant_article(text):
+                    page_urls.add(full_url)
+                    article_links.append((full_url, text))
             except Exception as e:
-                logging.error(f"Error scraping RSS feed {source['name']}: {e}")
+                logging.error(f"Error processing link: {e}")
+        return article_links
+    
+    def iter_news_site(self, site):
+        """Yield relevant articles from a single news website's search pages as they are extracted"""
+        # Links already queued for this site, so each article is fetched at most once
+        seen_urls = set()
         
-        return articles
+        try:
+            logging.info(f"Scraping website: {site['name']}")
+            
+            for term in self.search_terms:
+                try:
+                    # Construct search URL (this is simplified - each site has different search patterns)
+                    search_url = f"{site['search_url']}?q={term.replace(' ', '+')}"
+                    
+                    response = self.fetch(search_url, source=site['name'])
+                    response.raise_for_status()
+                    
+                    with metrics.SCRAPER_STAGE_SECONDS.time(source=site['name'], stage='parse'):
+                        article_links = self.extract_result_links(site, response.content, seen_urls)
+                    
+                    # Process found articles
+                    for url, title in article_links[:5]:  # Limit to 5 per search term
+                        seen_urls.add(url)
+                        if self.is_known_url(url, source=site['name']):
+                            continue
+                        try:
+                            content = self.extract_article_content(url, source=site['name'])
+                            if not content:
+                                continue
+                            with metrics.SCRAPER_STAGE_SECONDS.time(source=site['name'], stage='filter'):
+                                relevant = self.is_relevant_article(title, content)
+                            if relevant:
+                                metrics.SCRAPER_RELEVANT.inc(source=site['name'])
+                                article = {
+                                    'title': title,
+                                    'summary': content[:300] + '...' if len(content) > 300 else content,
+                                    'content': content,
+                                    'url': url,
+                                    'source': site['name'],
+                                    'published_date': datetime.now(),  # Fallback date
+                                    'category': site['category']
+                                }
+                                logging.info(f"Found article: {title[:50]}...")
+                                yield article
+                            
+                        except Exception as e:
+                            self.record_error(site['name'], 'article')
+                            logging.error(f"Error processing article {url}: {e}")
+                    
+                except Exception as e:
+                    self.record_error(site['name'], 'search')
+                    logging.error(f"Error searching {site['name']} for '{term}': {e}")
+                    continue
+            
+        except Exception as e:
+            self.record_error(site['name'], 'site')
+            logging.error(f"Error scraping website {site['name']}: {e}")
+    
+    def scrape_news_site(self, site):
+        """Scrape relevant articles from a single news website's search pages"""
+        return list(self.iter_news_site(site))
     
     def scrape_news_websites(self):
         """Scrape articles from news websites"""
         articles = []
-        
         for site in self.news_sites:
+            articles.extend(self.scrape_news_site(site))
+        return articles
+    
+    def source_names(self):
+        """Return the names of all configured sources, RSS feeds first"""
+        return [source['name'] for source in self.rss_sources + self.news_sites]
+    
+    def _source_tasks(self, duplicate_index=None, names=None):
+        """Return (article generator, source) pairs for the named sources (all by default), RSS feeds first"""
+        tasks = [(partial(self.iter_rss_source, duplicate_index=duplicate_index), source)
+                 for source in self.rss_sources]
+        tasks += [(self.iter_news_site, site) for site in self.news_sites]
+        if names is not None:
+            tasks = [(func, source) for func, source in tasks if source['name'] in names]
+        return tasks
+    
+    def iter_articles(self, progress=None, known_fingerprints=(), sources=None, source_done=None):
+        """Yield deduplicated articles one at a time while the sources are still being scraped
+        
+        Sources run in parallel on the worker pool (serially with max_workers=1).
+        `progress`, if given, is called as progress(source_name, state[, article_count])
+        with state 'pending', 'running' or 'done' while the crawl advances.
+        
+        `known_fingerprints` are (fingerprint, url, title) of stored articles; feed
+        entries that are near duplicates of them or of each other are not downloaded.
+        A near duplicate found before its article was yielded is attached to that
+        article as 'also_published'; one found later, or of a stored article, is
+        yielded as a merge record with a 'duplicate_of' URL.
+        
+        `sources` limits the crawl to the named sources. `source_done`, if given,
+        is called as source_done(source_name, article_count, error_count, seconds)
+        when a source finishes.
+        """
+        duplicate_index = near_duplicates.SimHashIndex()
+        stored_urls = set()
+        for fingerprint, url, title in known_fingerprints:
+            duplicate_index.add(fingerprint, url, title)
+            stored_urls.add(url)
+        
+        tasks = self._source_tasks(duplicate_index, sources)
+        found = queue.Queue()
+        source_finished = object()
+        
+        def run_source(func, source):
+            count = 0
+            errors_before = self.error_counts[source['name']]
+            start = time.perf_counter()
             try:
-                logging.info(f"Scraping website: {site['name']}")
-                
-                # Search for comfort women related articles (Japanese and US military)
-                search_terms = [
-                    'comfort women', '위안부', 'wartime sexual slavery',
-                    '미군 위안부', '기지촌', 'camp town', '기지촌 여성'
-                ]
-                
-                for term in search_terms:
-                    try:
-                        # Construct search URL (this is simplified - each site has different search patterns)
-                        search_url = f"{site['search_url']}?q={term.replace(' ', '+')}"
-                        
-                        response = self.session.get(search_url, timeout=10)
-                        response.raise_for_status()
-                        
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Generic article link extraction (adapt per site)
-                        article_links = []
-                        
-                        # Look for common article link patterns
-                        for link in soup.find_all('a', href=True):
-                            try:
-                                href = link.get('href') if hasattr(link, 'get') else link.attrs.get('href', '')
-                                text = link.get_text(strip=True) if hasattr(link, 'get_text') else str(link)
-                                
-                                if href and text and self.is_relevant_article(text):
-                                    # Ensure href is a string before passing to urljoin
-                                    href_str = str(href) if href else ''
-                                    full_url = urljoin(site['base_url'], href_str)
-                                    if full_url not in [a['url'] for a in articles]:
-                                        article_links.append((full_url, text))
-                            except Exception as e:
-                                logging.error(f"Error processing link: {e}")
-                                continue
-                        
-                        # Process found articles
-                        for url, title in article_links[:5]:  # Limit to 5 per search term
-                            try:
-                                content = self.extract_article_content(url)
-                                if content and self.is_relevant_article(title, content):
-                                    article = {
-                                        'title': title,
-                                        'summary': content[:300] + '...' if len(content) > 300 else content,
-                                        'content': content,
-                                        'url': url,
-                                        'source': site['name'],
-                                        'published_date': datetime.now(),  # Fallback date
-                                        'category': site['category']
-                                    }
-                                    articles.append(article)
-                                    logging.info(f"Found article: {title[:50]}...")
-                                
-                                time.sleep(1)  # Rate limiting
-                                
-                            except Exception as e:
-                                logging.error(f"Error processing article {url}: {e}")
-                        
-                        time.sleep(2)  # Rate limiting between searches
-                        
-                    except Exception as e:
-                        logging.error(f"Error searching {site['name']} for '{term}': {e}")
-                        continue
-                
+                if progress:
+                    progress(source['name'], 'running')
+                for article in func(source):
+                    found.put(article)
+                    if not article.get('duplicate_of'):
+                        count += 1
             except Exception as e:
-                logging.error(f"Error scraping website {site['name']}: {e}")
+                self.record_error(source['name'], 'source')
+                logging.error(f"Error scraping source {source['name']}: {e}")
+            finally:
+                if progress:
+                    progress(source['name'], 'done', count)
+                if source_done:
+                    source_done(source['name'], count, self.error_counts[source['name']] - errors_before,
+                                time.perf_counter() - start)
+                found.put(source_finished)
         
-        return articles
+        if progress:
+            for _, source in tasks:
+                progress(source['name'], 'pending')
+        
+        seen_urls = set()
+        # Near duplicates waiting for their article, by that article's URL
+        pending_copies = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scraper') as executor:
+            for func, source in tasks:
+                executor.submit(run_source, func, source)
+            
+            remaining = len(tasks)
+            while remaining:
+                item = found.get()
+                if item is source_finished:
+                    remaining -= 1
+                elif item.get('duplicate_of'):
+                    if item['duplicate_of'] in seen_urls or item['duplicate_of'] in stored_urls:
+                        yield item
+                    else:
+                        pending_copies.setdefault(item['duplicate_of'], []).append(item)
+                # Remove duplicates based on URL
+                elif item['url'] not in seen_urls:
+                    seen_urls.add(item['url'])
+                    copies = pending_copies.pop(item['url'], None)
+                    if copies:
+                        item['also_published'] = [{'source': copy['source'], 'url': copy['url']} for copy in copies]
+                    yield item
+        
+        # Copies of articles that failed after being claimed; the store drops them if unknown
+        for copies in pending_copies.values():
+            yield from copies
+        
+        logging.info(f"Scraping completed. Found {len(seen_urls)} unique articles")
     
-    def scrape_all_sources(self):
-        """Scrape all configured news sources"""
-        all_articles = []
+    def scrape_all_sources(self, progress=None):
+        """Scrape all configured news sources
         
+        Returns the articles newest first, followed by merge records for near
+        duplicates of articles that were yielded earlier.
+        """
         try:
-            # Scrape RSS feeds
-            rss_articles = self.scrape_rss_feeds()
-            all_articles.extend(rss_articles)
-            
-            # Scrape news websites
-            web_articles = self.scrape_news_websites()
-            all_articles.extend(web_articles)
-            
-            # Remove duplicates based on URL
-            seen_urls = set()
             unique_articles = []
-            for article in all_articles:
-                if article['url'] not in seen_urls:
-                    seen_urls.add(article['url'])
-                    unique_articles.append(article)
+            merge_records = []
+            for item in self.iter_articles(progress):
+                (merge_records if item.get('duplicate_of') else unique_articles).append(item)
             
             # Sort by publication date (newest first)
             unique_articles.sort(key=lambda x: x['published_date'], reverse=True)
-            
-            logging.info(f"Scraping completed. Found {len(unique_articles)} unique articles")
-            return unique_articles
+            return unique_articles + merge_records
             
         except Exception as e:
             logging.error(f"Error during scraping: {e}")
@@ -0,0 +1,101 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+from sqlalchemy import text
+
+
+class ProcessLock:
+    """Named lock shared by all worker processes of a deployment
+    
+    On PostgreSQL this is a session-level advisory lock held on a dedicated
+    connection, which also works across hosts; otherwise it is an exclusive
+    lock on a file next to the instance data, for processes on one host. Either
+    way the lock is released when the holding process exits.
+    """
+    
+    def __init__(self, engine, name, lock_dir):
+        self.engine = engine
+        self.name = name
+        self.path = os.path.join(lock_dir, f'{name}.lock')
+        # Advisory lock keys are signed 64-bit integers
+        self.key = int.from_bytes(hashlib.sha1(name.encode('utf-8')).digest()[:8], 'big', signed=True)
+        self._connection = None
+        self._file = None
+    
+    def acquire(self, blocking=True):
+        """Take the lock, waiting for it if blocking; returns False if it is held elsewhere"""
+        if self.engine.dialect.name == 'postgresql':
+            # Autocommit, so holding the lock does not keep a transaction open
+            connection = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+            if blocking:
+                connection.execute(text("SELECT pg_advisory_lock(:key)"), {'key': self.key})
+                acquired = True
+            else:
+                acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': self.key}).scalar()
+            if acquired:
+                self._connection = connection
+            else:
+                connection.close()
+            return bool(acquired)
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+    
+    def release(self):
+        if self._connection is not None:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': self.key})
+            self._connection.close()
+            self._connection = None
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class LeaderElection:
+    """Elects one process to run the scheduler; standby processes retry until the leader exits"""
+    
+    def __init__(self, lock, on_elected, retry_seconds=30):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.retry_seconds = retry_seconds
+    
+    def start(self):
+        """Try to become leader now, then keep retrying in a background thread until elected"""
+        if not self._try_lead():
+            logging.info(f"Another process holds the {self.lock.name} lock, standing by")
+            threading.Thread(target=self._retry, name='leader-election', daemon=True).start()
+    
+    def _try_lead(self):
+        try:
+            if not self.lock.acquire(blocking=False):
+                return False
+        except Exception as e:
+            logging.error(f"Error acquiring the {self.lock.name} lock: {e}")
+            return False
+        logging.info(f"Process {os.getpid()} elected as {self.lock.name} leader")
+        self.on_elected()
+        return True
+    
+    def _retry(self):
+        while True:
+            time.sleep(self.retry_seconds)
+            if self._try_lead():
+                return
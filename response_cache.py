@@ -0,0 +1,78 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response
+import metrics
+
+
+class ResponseCache:
+    """LRU cache of rendered responses keyed by (path, query args, data version)
+    
+    `version` is called on every request and must change whenever anything the
+    cached pages show changes. The ETag is derived from the cache key alone, so
+    a conditional request for an unchanged page is answered with 304 before the
+    view (or the cache) is even consulted.
+    """
+    
+    def __init__(self, version, max_entries=512):
+        self.version = version
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _key(self):
+        return (request.path, tuple(sorted(request.args.items(multi=True))), self.version())
+    
+    @staticmethod
+    def make_etag(key):
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def cached(self, view):
+        """Decorator serving a GET view from the cache, with ETag revalidation"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self._key()
+            etag = self.make_etag(key)
+            
+            if request.if_none_match.contains(etag):
+                metrics.PAGE_CACHE_REQUESTS.inc(result='not_modified')
+                response = make_response('', 304)
+            else:
+                entry = self.get(key)
+                if entry is not None:
+                    metrics.PAGE_CACHE_REQUESTS.inc(result='hit')
+                    body, status, mimetype = entry
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                else:
+                    metrics.PAGE_CACHE_REQUESTS.inc(result='miss')
+                    response = make_response(view(*args, **kwargs))
+                    # Only successful renders are cached; errors are retried on the next request
+                    if response.status_code != 200:
+                        return response
+                    self.put(key, (response.get_data(), response.status_code, response.mimetype))
+            
+            response.set_etag(etag)
+            # Clients may keep the page but must revalidate it, which is cheap
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
@@ -1,33 +1,82 @@
-from flask import render_template, request, jsonify, url_for
-from app import app, articles_storage, last_update
+from flask import render_template, request, jsonify, url_for, g, Response, stream_with_context
+from app import app
+import base64
+import json
 import logging
+import time
 from datetime import datetime
-from ai_summary_service import VertexAISummaryService
+import article_store
+import article_tags
+import metrics
+from response_cache import ResponseCache
+
+def page_version():
+    """Version of everything the cached pages show: the stored articles and the front-page summary"""
+    state = article_store.get_state()
+    return state['version'], state['summary_fingerprint']
+
+# Rendered pages, reused until the next ingest or summary refresh
+page_cache = ResponseCache(page_version, max_entries=app.config["PAGE_CACHE_SIZE"])
+
+# Articles per /api/articles page, by default and at most
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+def encode_cursor(article):
+    """Opaque pagination cursor for the (published_date, id) key of an article"""
+    key = f"{article.published_date.isoformat()}|{article.id}"
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Return the (published_date, id) key of a cursor; raises ValueError if it is malformed"""
+    try:
+        published_date, article_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(published_date), int(article_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def article_filters():
+    """The keyword, category and source filters of the request, as for /search"""
+    return (request.args.get('q', '').strip(),
+            request.args.get('category', ''),
+            request.args.get('source', ''))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Observe the request latency under its URL rule, so /article/<path:url> is one series"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route,
+                                             method=request.method, status=response.status_code)
+    return response
 
 @app.route('/')
+@page_cache.cached
 def index():
     """Main page showing latest articles with AI summary"""
-    page = request.args.get('page', 1, type=int)
+    page = max(1, request.args.get('page', 1, type=int))
     per_page = 10
     
     # Get articles for current page
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    page_articles = articles_storage[start_idx:end_idx]
+    page_articles = article_store.get_latest_articles(start_idx, per_page)
     
     # Calculate pagination info
-    total_articles = len(articles_storage)
+    total_articles = article_store.count_articles()
     has_prev = page > 1
     has_next = end_idx < total_articles
     
-    # Generate AI summary for the first page only
+    # Show the precomputed AI summary on the first page only
     ai_summary = None
-    if page == 1 and articles_storage:
-        try:
-            ai_service = VertexAISummaryService()
-            ai_summary = ai_service.generate_summary(articles_storage[:5])
-        except Exception as e:
-            logging.error(f"Error generating AI summary: {e}")
+    if page == 1 and total_articles:
+        from app import summary_cache
+        ai_summary = summary_cache.get()
     
     return render_template('index.html',
                          articles=page_articles,
@@ -35,18 +84,15 @@ def index():
                          has_prev=has_prev,
                          has_next=has_next,
                          total_articles=total_articles,
-                         last_update=last_update,
+                         last_update=article_store.get_last_update(),
                          ai_summary=ai_summary)
 
 @app.route('/article/<path:url>')
+@page_cache.cached
 def article_detail(url):
     """Show detailed view of a specific article"""
     # Find article by URL
-    article = None
-    for a in articles_storage:
-        if a['url'] == url:
-            article = a
-            break
+    article = article_store.get_article_by_url(url)
     
     if not article:
         return render_template('article.html', article=None, error="Article not found")
@@ -54,53 +100,31 @@ def article_detail(url):
     return render_template('article.html', article=article)
 
 @app.route('/search')
+@page_cache.cached
 def search():
     """Search articles by keyword"""
-    query = request.args.get('q', '').strip()
-    category = request.args.get('category', '')
-    source = request.args.get('source', '')
-    page = request.args.get('page', 1, type=int)
+    query, category, source = article_filters()
+    page = max(1, request.args.get('page', 1, type=int))
     per_page = 10
     
-    # Filter articles based on search criteria
-    filtered_articles = articles_storage.copy()
-    
-    if query:
-        query_lower = query.lower()
-        filtered_articles = [
-            article for article in filtered_articles
-            if query_lower in article['title'].lower() or
-               query_lower in article.get('summary', '').lower() or
-               query_lower in article.get('content', '').lower()
-        ]
-    
-    if category:
-        filtered_articles = [
-            article for article in filtered_articles
-            if article.get('category', '').lower() == category.lower()
-        ]
-    
-    if source:
-        filtered_articles = [
-            article for article in filtered_articles
-            if article.get('source', '').lower() == source.lower()
-        ]
-    
-    # Pagination
-    total_results = len(filtered_articles)
+    # Filter articles based on search criteria, one page at a time
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    page_articles = filtered_articles[start_idx:end_idx]
+    page_articles, total_results = article_store.search_articles(query, category, source, start_idx, per_page)
+    snippets = article_store.search_snippets(query, page_articles)
     
     has_prev = page > 1
-    has_next = end_idx < total_results
+    # Keyword searches count at most SEARCH_MAX_RESULTS matches and list no more
+    results_capped = bool(query) and total_results > article_store.SEARCH_MAX_RESULTS
+    has_next = end_idx < (article_store.SEARCH_MAX_RESULTS if results_capped else total_results)
     
     # Get available categories and sources for filters
-    categories = list(set(article.get('category', '') for article in articles_storage if article.get('category')))
-    sources = list(set(article.get('source', '') for article in articles_storage if article.get('source')))
+    categories = article_store.get_categories()
+    sources = article_store.get_sources()
     
     return render_template('search.html',
                          articles=page_articles,
+                         snippets=snippets,
                          query=query,
                          category=category,
                          source=source,
@@ -108,62 +132,59 @@ def search():
                          has_prev=has_prev,
                          has_next=has_next,
                          total_results=total_results,
+                         results_capped=results_capped,
                          categories=categories,
                          sources=sources)
 
 @app.route('/refresh')
 def refresh_articles():
-    """Manually trigger article refresh"""
-    try:
-        from news_scraper import NewsScraperService
-        scraper = NewsScraperService()
-        
-        logging.info("Manual refresh triggered")
-        new_articles = scraper.scrape_all_sources()
-        
-        # Add new articles to storage (avoid duplicates)
-        existing_urls = {article['url'] for article in articles_storage}
-        added_count = 0
-        
-        for article in new_articles:
-            if article['url'] not in existing_urls:
-                articles_storage.append(article)
-                added_count += 1
-        
-        # Sort by date and limit articles
-        articles_storage.sort(key=lambda x: x['published_date'], reverse=True)
-        if len(articles_storage) > 200:
-            articles_storage[:] = articles_storage[:200]
-        
-        global last_update
-        last_update = datetime.now()
-        
-        return jsonify({
-            'success': True,
-            'message': f'Added {added_count} new articles. Total: {len(articles_storage)}',
-            'total_articles': len(articles_storage)
-        })
-        
-    except Exception as e:
-        logging.error(f"Error during manual refresh: {e}")
+    """Start a background article refresh, join the one already running, or queue one after it"""
+    from app import crawl_jobs
+    
+    job, started = crawl_jobs.submit(trigger='manual')
+    if started:
+        logging.info(f"Manual refresh triggered as job {job.id}")
+        message = 'Refresh started'
+    elif job.status == 'queued':
+        message = 'Refresh queued to run after the current one'
+    else:
+        message = 'A refresh is already running'
+    
+    return jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job.id,
+        'status_url': url_for('refresh_status', job_id=job.id)
+    }), 202
+
+@app.route('/refresh/status/<job_id>')
+def refresh_status(job_id):
+    """Report the progress of a refresh job"""
+    from app import crawl_jobs
+    
+    job = crawl_jobs.get(job_id)
+    if not job:
         return jsonify({
             'success': False,
-            'message': f'Error refreshing articles: {str(e)}'
-        }), 500
+            'message': 'Unknown refresh job'
+        }), 404
+    
+    return jsonify(dict(job.to_dict(), success=True))
 
 @app.route('/archive')
+@page_cache.cached
 def archive():
     """Archive page showing all articles by date"""
-    page = request.args.get('page', 1, type=int)
+    page = max(1, request.args.get('page', 1, type=int))
     per_page = 20
     
     # Get articles for current page
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    page_articles = articles_storage[start_idx:end_idx]
+    page_articles = article_store.get_latest_articles(start_idx, per_page)
     
     # Calculate pagination info
-    total_articles = len(articles_storage)
+    total_articles = article_store.count_articles()
     has_prev = page > 1
     has_next = end_idx < total_articles
     
@@ -172,7 +193,7 @@ def archive():
     articles_by_date = defaultdict(list)
     
     for article in page_articles:
-        date_key = article['published_date'].strftime('%Y-%m-%d') if article['published_date'] else 'Unknown Date'
+        date_key = article.published_date.strftime('%Y-%m-%d') if article.published_date else 'Unknown Date'
         articles_by_date[date_key].append(article)
     
     return render_template('archive.html',
@@ -181,28 +202,84 @@ def archive():
                          has_prev=has_prev,
                          has_next=has_next,
                          total_articles=total_articles,
-                         last_update=last_update)
+                         last_update=article_store.get_last_update())
 
 @app.route('/api/stats')
+@page_cache.cached
 def api_stats():
     """API endpoint for article statistics"""
-    categories = {}
-    sources = {}
+    categories = {cat or 'Uncategorized': count for cat, count in article_store.get_facet_counts('category').items()}
+    sources = {source or 'Unknown': count for source, count in article_store.get_facet_counts('source').items()}
+    days = {day or 'Unknown': count for day, count in article_store.get_facet_counts('day').items()}
     
-    for article in articles_storage:
-        cat = article.get('category', 'Uncategorized')
-        source = article.get('source', 'Unknown')
-        
-        categories[cat] = categories.get(cat, 0) + 1
-        sources[source] = sources.get(source, 0) + 1
+    tags = {kind: article_store.get_facet_counts(kind) for kind in article_tags.TAG_KINDS}
     
+    last_update = article_store.get_last_update()
     return jsonify({
-        'total_articles': len(articles_storage),
+        'total_articles': article_store.count_articles(),
         'categories': categories,
         'sources': sources,
+        'days': days,
+        'tags': tags,
         'last_update': last_update.isoformat() if last_update else None
     })
 
+@app.route('/api/articles')
+@page_cache.cached
+def api_articles():
+    """JSON page of articles newest first, with the filters of /search and keyset pagination
+    
+    Pass the returned next_cursor as ?cursor= to get the following page; add
+    content=1 to include the article bodies.
+    """
+    query, category, source = article_filters()
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    with_content = request.args.get('content', '0').lower() in ('1', 'true', 'yes')
+    
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    
+    # One extra row tells whether there is a next page
+    page = article_store.get_article_page(query, category, source, after, limit + 1, with_content)
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    args = {key: value for key, value in request.args.items() if key != 'cursor'}
+    return jsonify({
+        'success': True,
+        'articles': [article.to_dict() for article in page[:limit]],
+        'next_cursor': next_cursor,
+        'next_url': url_for('api_articles', cursor=next_cursor, **args) if next_cursor else None
+    })
+
+@app.route('/api/articles/export')
+def api_articles_export():
+    """Stream every matching article as newline-delimited JSON, newest first
+    
+    Takes the filters of /api/articles; rows are read and written one batch at
+    a time, so the export never holds the whole result in memory.
+    """
+    query, category, source = article_filters()
+    with_content = request.args.get('content', '0').lower() in ('1', 'true', 'yes')
+    
+    def generate():
+        for article in article_store.iter_article_records(query, category, source, with_content):
+            yield json.dumps(article.to_dict(), ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Crawler and request metrics of this worker process in the Prometheus text format
+    
+    Metrics are not shared between processes: crawl metrics only move in the
+    scheduler leader, and request metrics cover this worker's requests only.
+    """
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('index.html', error="Page not found"), 404
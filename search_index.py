@@ -0,0 +1,218 @@
+import logging
+import re
+from sqlalchemy import column, func, literal_column, select, table, text
+from app import db
+from models import Article
+from near_duplicates import WORD_RE
+
+# Number of articles written per statement when (re)building the index
+INDEX_BATCH_SIZE = 500
+
+INDEXED_FIELDS = ('title', 'summary', 'content')
+
+# BM25 weight of each indexed field, so a title hit outranks a passing mention in the body
+FIELD_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Age in days at which an article's relevance counts half in search ranking
+RECENCY_DAYS = 30.0
+
+# Characters of an article's summary shown around the first query word in search results
+SNIPPET_CHARS = 200
+
+# The index is contentless: it keeps only the token lists needed for MATCH and
+# bm25(), not a second copy of the bigram-expanded text
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(title, summary, content, "
+    "content='', tokenize='unicode61')"
+)
+
+_fts = table('article_fts', column('rowid'))
+
+
+def is_supported():
+    """The full-text index uses SQLite FTS5; other databases fall back to ILIKE scans"""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def to_index_text(value):
+    """Expand text into character bigrams so substring search works for Korean words
+    
+    Each word becomes its overlapping bigrams followed by its last character,
+    e.g. '위안부' -> '위안 안부 부', which lets two-character queries match.
+    """
+    tokens = []
+    for word in WORD_RE.findall((value or '').lower()):
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return ' '.join(tokens)
+
+
+def to_match_query(query):
+    """Build an FTS5 MATCH expression requiring every query word as a substring"""
+    clauses = []
+    for word in WORD_RE.findall(query.lower()):
+        if len(word) == 1:
+            clauses.append(f'"{word}"*')
+        else:
+            clauses.append('"' + ' '.join(word[i:i + 2] for i in range(len(word) - 1)) + '"')
+    return ' AND '.join(clauses)
+
+
+def _drop_stored_content_index():
+    """Drop an article_fts table created before the index was contentless; returns True if dropped"""
+    sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'article_fts'")).scalar()
+    if sql is None or "content=''" in sql:
+        return False
+    logging.info("Replacing the search index with a contentless one")
+    db.session.execute(text("DROP TABLE article_fts"))
+    db.session.commit()
+    return True
+
+
+def _vacuum():
+    """Return the pages freed by a dropped index to the filesystem"""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text("VACUUM"))
+
+
+def ensure_search_index():
+    """Create the FTS5 table and backfill it if it is out of step with the article table"""
+    if not is_supported():
+        return
+    dropped = _drop_stored_content_index()
+    db.session.execute(text(CREATE_SQL))
+    indexed = db.session.execute(text("SELECT count(*) FROM article_fts")).scalar()
+    total = db.session.query(Article.id).count()
+    if indexed != total:
+        logging.info(f"Rebuilding search index ({indexed} indexed, {total} articles)")
+        db.session.execute(text("INSERT INTO article_fts (article_fts) VALUES ('delete-all')"))
+        batch = []
+        for article in Article.query.yield_per(INDEX_BATCH_SIZE):
+            batch.append(article)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                index_articles(batch)
+                batch = []
+        index_articles(batch)
+    db.session.commit()
+    if dropped:
+        _vacuum()
+
+
+def indexed_values(article):
+    """Return the {field: value} an article is indexed with, needed later to remove its entry"""
+    return {field: getattr(article, field) for field in INDEXED_FIELDS}
+
+
+def _index_row(article_id, values):
+    return dict(id=article_id, **{field: to_index_text(values[field]) for field in INDEXED_FIELDS})
+
+
+def index_articles(articles, previous=None):
+    """Add the index entries of the given (flushed) articles in the current transaction
+    
+    A contentless index cannot look up what it indexed, so replacing an entry
+    takes the values it was indexed with: `previous` maps the id of every
+    already indexed article among them to its indexed_values() before the change.
+    """
+    if not articles or not is_supported():
+        return
+    if previous:
+        db.session.execute(
+            text("INSERT INTO article_fts (article_fts, rowid, title, summary, content) "
+                 "VALUES ('delete', :id, :title, :summary, :content)"),
+            [_index_row(article_id, values) for article_id, values in previous.items()]
+        )
+    db.session.execute(
+        text("INSERT INTO article_fts (rowid, title, summary, content) VALUES (:id, :title, :summary, :content)"),
+        [_index_row(article.id, indexed_values(article)) for article in articles]
+    )
+
+
+def ranked_matches(query, ids):
+    """Return a subquery of (rowid, score) of the given matching article ids, or None if not indexable
+    
+    Only those articles are scored. The score is FTS5's BM25 over the weighted
+    fields, computed from the term and document length statistics FTS5
+    maintains as articles are indexed; lower is better.
+    """
+    if not is_supported() or not ids:
+        return None
+    match = to_match_query(query)
+    if not match:
+        return None
+    weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+    # FTS5 skips the matches below the rowid bound; '+rowid' keeps SQLite from
+    # running the MATCH once per id instead of filtering that one scan
+    return select(_fts.c.rowid, literal_column(f"bm25(article_fts, {weights})").label('score')).where(
+        text("article_fts MATCH :match").bindparams(match=match),
+        _fts.c.rowid >= min(ids),
+        literal_column('+rowid').in_(ids)
+    ).subquery('matches')
+
+
+def rank_order(score, published_date):
+    """Order expression combining a BM25 score with the article's age; ascending is best first
+    
+    BM25 scores are negative, so dividing by 1 + age / RECENCY_DAYS moves older
+    articles towards zero, i.e. down the results.
+    """
+    age_days = func.max(func.julianday('now') - func.julianday(published_date), 0.0)
+    return score / (1.0 + age_days / RECENCY_DAYS)
+
+
+def _query_pattern(query):
+    """Regex matching any query word case-insensitively, longest first, or None for a query without words"""
+    words = sorted(set(WORD_RE.findall(query.lower())), key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+
+
+def highlight(value, query, width=SNIPPET_CHARS):
+    """Return [(text, highlighted)] segments of about width characters of value with the query words marked
+    
+    The excerpt starts at the beginning of the text, or a few words before the
+    first query word if that lies further in, and is cut at a word boundary.
+    Returns None if the text contains none of the query words.
+    """
+    pattern = _query_pattern(query)
+    hits = list(pattern.finditer(value)) if pattern and value else []
+    if not hits:
+        return None
+    first = hits[0]
+    start = 0
+    if first.end() > width:
+        start = first.start() - width // 4
+        space = value.find(' ', start, first.start())
+        if space >= 0:
+            start = space + 1
+    end = min(len(value), max(start + width, first.end()))
+    if end < len(value):
+        space = value.rfind(' ', first.end(), end)
+        if space > 0:
+            end = space
+    
+    segments = [('… ', False)] if start else []
+    position = start
+    for hit in hits:
+        if hit.start() >= end:
+            break
+        if hit.start() > position:
+            segments.append((value[position:hit.start()], False))
+        segments.append((value[hit.start():min(hit.end(), end)], True))
+        position = min(hit.end(), end)
+    if position < end:
+        segments.append((value[position:end], False))
+    if end < len(value):
+        segments.append((' …', False))
+    return segments
+
+
+def matching_ids(query):
+    """Return a subquery selecting the ids of articles matching the query, or None if not indexable"""
+    if not is_supported():
+        return None
+    match = to_match_query(query)
+    if not match:
+        return None
+    return text("SELECT rowid FROM article_fts WHERE article_fts MATCH :match").bindparams(match=match).columns(column('rowid'))
@@ -0,0 +1,101 @@
+import threading
+import time
+import metrics
+
+# Weight of the latest poll in the moving averages of a source's statistics
+SMOOTHING = 0.3
+
+# Average new articles per poll at or above which a source is polled more often
+PRODUCTIVE_RATE = 0.5
+
+# Average share of failed polls at or above which a source is backed off
+FAILING_RATE = 0.5
+
+# Interval multipliers for productive, quiet and failing sources
+SPEEDUP = 0.5
+SLOWDOWN = 1.5
+ERROR_BACKOFF = 2.0
+
+# A source may take at most 1/MAX_DUTY_FACTOR of the wall-clock time, so slow
+# sources (site searches download several pages per poll) are never polled as
+# often as a single feed
+MAX_DUTY_FACTOR = 60
+
+
+class SourcePoller:
+    """Per-source polling intervals adapted to how productive and reliable each source is
+    
+    Every source starts at the initial interval. After each poll its moving
+    averages of new articles, failures and poll duration are updated, and its
+    interval shrinks while it keeps producing new articles, grows while it is
+    quiet, and grows faster while it fails, always within [min_interval, max_interval].
+    """
+    
+    def __init__(self, names, initial_interval, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        now = time.time()
+        self._sources = {
+            name: {
+                'interval': self._clamp(initial_interval),
+                'next_poll': now + self._clamp(initial_interval),
+                'last_poll': None,
+                'polls': 0,
+                'new_rate': 0.0,
+                'error_rate': 0.0,
+                'poll_seconds': 0.0
+            }
+            for name in names
+        }
+        self._lock = threading.Lock()
+        for name, state in self._sources.items():
+            metrics.SOURCE_POLL_INTERVAL.set(state['interval'], source=name)
+    
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+    
+    def due(self, now=None):
+        """Return the names of the sources whose next poll is due"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return [name for name, state in self._sources.items() if state['next_poll'] <= now]
+    
+    def start(self, names, now=None):
+        """Mark the sources as being polled, so they are not due again until their polls are recorded
+        
+        A source whose poll is never recorded, as when the crawl fails, is due
+        again after the maximum interval.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for name in names:
+                state = self._sources.get(name)
+                if state is not None:
+                    state['next_poll'] = now + self.max_interval
+    
+    def record(self, name, new_articles, errors, seconds, now=None):
+        """Update a source's statistics with the outcome of a poll and schedule its next one"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._sources.get(name)
+            if state is None:
+                return
+            failed = 1.0 if errors and not new_articles else 0.0
+            # The first poll seeds the averages
+            weight = SMOOTHING if state['polls'] else 1.0
+            state['new_rate'] += weight * (new_articles - state['new_rate'])
+            state['error_rate'] += weight * (failed - state['error_rate'])
+            state['poll_seconds'] += weight * (seconds - state['poll_seconds'])
+            state['polls'] += 1
+            state['last_poll'] = now
+            
+            if state['error_rate'] >= FAILING_RATE:
+                interval = state['interval'] * ERROR_BACKOFF
+            elif state['new_rate'] >= PRODUCTIVE_RATE:
+                interval = state['interval'] * SPEEDUP
+            else:
+                interval = state['interval'] * SLOWDOWN
+            interval = self._clamp(max(interval, state['poll_seconds'] * MAX_DUTY_FACTOR))
+            state['interval'] = interval
+            state['next_poll'] = now + interval
+        metrics.SOURCE_POLL_INTERVAL.set(interval, source=name)
@@ -75,14 +75,22 @@ async function refreshArticles() {
         const response = await fetch('/refresh');
         const data = await response.json();
         
-        if (data.success) {
-            showAlert(data.message, 'success');
+        if (!data.success) {
+            showAlert(data.message, 'danger');
+            return;
+        }
+        
+        // The crawl runs in the background; poll its status until it finishes
+        const job = await waitForRefreshJob(data.status_url, refreshBtn);
+        
+        if (job.status === 'completed') {
+            showAlert(`Added ${job.added_count} new articles. Total: ${job.total_articles}`, 'success');
             // Reload page after 2 seconds to show new articles
             setTimeout(() => {
                 window.location.reload();
             }, 2000);
         } else {
-            showAlert(data.message, 'danger');
+            showAlert(`Error refreshing articles: ${job.error || job.message}`, 'danger');
         }
     } catch (error) {
         console.error('Error refreshing articles:', error);
@@ -94,6 +102,22 @@ async function refreshArticles() {
     }
 }
 
+// Function to poll a refresh job until it is no longer queued or running
+async function waitForRefreshJob(statusUrl, refreshBtn) {
+    while (true) {
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        
+        // A crawl requested from another worker stays queued until the crawling process starts it
+        if (!job.success || (job.status !== 'running' && job.status !== 'queued')) {
+            return job;
+        }
+        
+        refreshBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Refreshing... (${job.sources_done}/${job.sources_total})`;
+        await new Promise(resolve => setTimeout(resolve, 3000));
+    }
+}
+
 // Function to show alerts
 function showAlert(message, type = 'info') {
     const alertContainer = document.getElementById('alertContainer');
@@ -0,0 +1,67 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Fixed-size set membership filter with no false negatives and a bounded false positive rate"""
+    
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        # Optimal bit count and number of hash functions for the capacity and error rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+    
+    def _positions(self, item):
+        # Double hashing: k positions from two independent 64-bit hashes
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+    
+    def add(self, item):
+        with self._lock:
+            for position in self._positions(item):
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+    
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    @property
+    def is_full(self):
+        """True once more items were added than the filter was sized for"""
+        return self.count > self.capacity
+
+
+class SeenUrlFilter:
+    """URLs of stored articles, checked by the scraper before downloading an article
+    
+    Lookups are answered from a Bloom filter in memory; a positive is confirmed
+    with `confirm(url)` (an exact lookup in the store) when given, so a false
+    positive never makes the scraper skip a new article.
+    """
+    
+    def __init__(self, capacity, error_rate=0.001, confirm=None):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.confirm = confirm
+    
+    def add(self, url):
+        self.bloom.add(url)
+    
+    def update(self, urls):
+        for url in urls:
+            self.bloom.add(url)
+    
+    def __contains__(self, url):
+        if url not in self.bloom:
+            return False
+        return self.confirm(url) if self.confirm else True
+    
+    @property
+    def is_full(self):
+        return self.bloom.is_full